@@ -0,0 +1,289 @@
+'''Offline benchmarks for the scheduling core.
+
+Runs the hot paths against in-memory stand-ins for the Discord objects they touch, so no token or network is needed:
+
+    python benchmarks/bench_scheduler.py
+    python benchmarks/bench_scheduler.py --participants 10 100 1000 --events 1 50
+'''
+
+import os
+import sys
+import time
+import random
+import logging
+import argparse
+from asyncio import run, sleep
+from itertools import count
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import bot
+from discord import EntityType, EventStatus, Intents
+
+PARTICIPANT_SCALES = [10, 100, 1000, 10000]
+EVENT_SCALES = [1, 10, 100, 500]
+ids = count(1)
+
+
+class FakeMessage:
+    def __init__(self, channel, content):
+        self.id = next(ids)
+        self.channel = channel
+        self.content = content
+
+    async def edit(self, content=None, view=None):
+        self.content = content
+
+
+class FakeMember:
+    def __init__(self, guild):
+        self.id = next(ids)
+        self.name = f'member{self.id}'
+        self.mention = f'<@{self.id}>'
+        self.guild = guild
+        self.roles = []
+        self.bot = False
+        self.sent = 0
+
+    async def send(self, content=None, view=None):
+        self.sent += 1
+        return FakeMessage(self, content)
+
+
+class FakeTextChannel:
+    def __init__(self, guild):
+        self.id = next(ids)
+        self.guild = guild
+        self.sent = 0
+
+    async def send(self, content=None, view=None):
+        self.sent += 1
+        return FakeMessage(self, content)
+
+    def get_partial_message(self, message_id):
+        return FakeMessage(self, '')
+
+
+class FakeVoiceChannel:
+    def __init__(self, guild):
+        self.id = next(ids)
+        self.guild = guild
+        self.name = f'voice{self.id}'
+
+
+class FakeScheduledEvent:
+    def __init__(self, guild, name, start_time, end_time, entity_type, channel):
+        self.id = next(ids)
+        self.guild = guild
+        self.guild_id = guild.id
+        self.name = name
+        self.start_time = start_time
+        self.end_time = end_time
+        self.entity_type = entity_type
+        self.channel_id = channel.id if channel else None
+        self.location = None
+        self.status = EventStatus.scheduled
+        # every guild member is interested, so reconciling keeps the participants the event was solved with
+        self.subscribers = list(guild.members)
+
+    async def edit(self, **kwargs):
+        pass
+
+    async def delete(self, *, reason=None):
+        self.guild.scheduled_events.remove(self)
+
+    async def start(self, *, reason=None):
+        self.status = EventStatus.active
+
+    async def users(self):
+        for user in self.subscribers:
+            yield user
+
+
+class FakeGuild:
+    def __init__(self, member_count: int):
+        self.id = next(ids)
+        self.name = f'guild{self.id}'
+        self.members = [FakeMember(self) for _ in range(member_count)]
+        self.members_by_id = {member.id: member for member in self.members}
+        self.scheduled_events = []
+
+    def get_member(self, member_id):
+        return self.members_by_id.get(member_id)
+
+    def get_scheduled_event(self, scheduled_event_id):
+        for scheduled_event in self.scheduled_events:
+            if scheduled_event.id == scheduled_event_id:
+                return scheduled_event
+        return None
+
+    async def create_scheduled_event(self, name, description, start_time, end_time, entity_type, channel, privacy_level):
+        scheduled_event = FakeScheduledEvent(self, name, start_time, end_time, entity_type, channel)
+        self.scheduled_events.append(scheduled_event)
+        return scheduled_event
+
+
+class FakeResponse:
+    async def send_message(self, content=None, view=None, ephemeral=False):
+        pass
+
+    async def edit_message(self, content=None, view=None):
+        pass
+
+
+class FakeInteraction:
+    def __init__(self, user, custom_id: str = ''):
+        self.user = user
+        self.data = {'custom_id': custom_id}
+        self.response = FakeResponse()
+
+
+def make_client():
+    client = bot.SchedulerClient(intents=Intents.none())
+    # measure our own overhead rather than Discord's DM rate limit
+    client.dm_dispatcher.bucket = bot.TokenBucket(1e9, 1e9)
+    client.dm_dispatcher.recipient_rate = 1e9
+    client.dm_dispatcher.recipient_burst = 1e9
+    bot.client = client
+    return client
+
+
+def make_events(client, event_count: int, participant_count: int, answered: bool = True):
+    # every event draws its participants from one shared guild so indexes see realistic overlap
+    guild = FakeGuild(participant_count)
+    text_channel = FakeTextChannel(guild)
+    events = []
+    for index in range(event_count):
+        participants = []
+        for member in guild.members:
+            participant = bot.Participant(member)
+            participant.availability = random.getrandbits(len(bot.slot_calendar.labels)) | (1 << (len(bot.slot_calendar.labels) - 1))
+            participant.answered = answered
+            participants.append(participant)
+        event = bot.Event(f'event{index}', EntityType.voice, FakeVoiceChannel(guild), participants, guild, text_channel, None)
+        client.add_event(event)
+        events.append(event)
+    return guild, events
+
+
+def reset(client):
+    for event in client.events.copy():
+        client.remove_event(event)
+    client.deadlines.deadlines.clear()
+    client.scheduled_events.clear()
+    client.subscribers.clear()
+    for create_queue, cancel_queue, tasks in client.guild_workers.values():
+        for task in tasks:
+            task.cancel()
+    client.guild_workers.clear()
+
+
+def report(name: str, participants: int, events: int, seconds: float, operations: int):
+    print(f'{name:<22} participants={participants:<6} events={events:<4} total={seconds * 1000:>10.2f}ms  per op={seconds / operations * 1e6:>10.2f}us')
+
+
+async def bench_check_times(client, participant_count: int, event_count: int):
+    guild, events = make_events(client, event_count, participant_count)
+    start = time.perf_counter()
+    for event in events:
+        event.valid = True
+        event.check_times()
+    report('check_times', participant_count, event_count, time.perf_counter() - start, event_count)
+    reset(client)
+
+
+async def bench_quorum(client, participant_count: int, event_count: int):
+    guild, events = make_events(client, event_count, participant_count)
+    start = time.perf_counter()
+    for event in events:
+        event.valid = True
+        event.quorum = max(1, participant_count // 2)
+        event.check_times()
+    report('check_times quorum', participant_count, event_count, time.perf_counter() - start, event_count)
+    reset(client)
+
+
+async def bench_toggles(client, participant_count: int, event_count: int):
+    guild, events = make_events(client, event_count, participant_count, answered=False)
+    interactions = []
+    for event in events:
+        for participant in event.participants:
+            slot = random.randrange(len(bot.slot_calendar.labels))
+            interactions.append(FakeInteraction(participant.member, event.get_custom_id('slot', slot)))
+    start = time.perf_counter()
+    for interaction in interactions:
+        await client.dispatch_component(interaction)
+    report('availability toggle', participant_count, event_count, time.perf_counter() - start, len(interactions))
+    reset(client)
+
+
+async def bench_dm_fan_out(client, participant_count: int, event_count: int):
+    guild, events = make_events(client, event_count, participant_count, answered=False)
+    interaction = FakeInteraction(guild.members[0])
+    start = time.perf_counter()
+    for event in events:
+        await event.dm_all_participants(interaction)
+    report('dm fan-out', participant_count, event_count, time.perf_counter() - start, participant_count * event_count)
+    reset(client)
+
+
+async def bench_minute_tick(client, participant_count: int, event_count: int):
+    guild, events = make_events(client, event_count, participant_count)
+    start = time.perf_counter()
+    await client.solve_events()
+    # let the per-guild create and cancel workers drain what the solve stage queued
+    while any(event.tracked and (event.ready_to_create or not event.valid) for event in events):
+        await sleep(0)
+    await client.parse_scheduled_events()
+    await client.save_state()
+    report('minute tick', participant_count, event_count, time.perf_counter() - start, event_count)
+    reset(client)
+
+
+async def bench_reconcile(client, participant_count: int, event_count: int):
+    guild = FakeGuild(participant_count)
+    start_time = datetime.now().astimezone() + timedelta(hours=1)
+    for index in range(event_count):
+        scheduled_event = await guild.create_scheduled_event(f'event{index}', '', start_time, start_time + timedelta(minutes=30), EntityType.external, None, None)
+        scheduled_event.location = f'location{index}'
+        client.upsert_scheduled_event(scheduled_event)
+    # the first pass adopts every scheduled event and pages through its users, the second is served by the subscriber cache
+    start = time.perf_counter()
+    await client.parse_scheduled_events()
+    report('reconcile cold', participant_count, event_count, time.perf_counter() - start, event_count)
+    start = time.perf_counter()
+    await client.parse_scheduled_events()
+    report('reconcile warm', participant_count, event_count, time.perf_counter() - start, event_count)
+    reset(client)
+
+
+async def run_benchmarks(participant_scales: list, event_scales: list, max_participants: int, state_filename: str):
+    client = make_client()
+    client.state_filename = state_filename
+    for benchmark in (bench_check_times, bench_quorum, bench_toggles, bench_dm_fan_out, bench_reconcile, bench_minute_tick):
+        for participant_count in participant_scales:
+            for event_count in event_scales:
+                # keep the largest combinations from running for minutes on a laptop
+                if participant_count * event_count > max_participants:
+                    continue
+                await benchmark(client, participant_count, event_count)
+        print()
+    if os.path.exists(state_filename):
+        os.remove(state_filename)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the scheduling core without Discord.')
+    parser.add_argument('--participants', type=int, nargs='+', default=PARTICIPANT_SCALES)
+    parser.add_argument('--events', type=int, nargs='+', default=EVENT_SCALES)
+    parser.add_argument('--max-participants', type=int, default=100000, help='Skip combinations with more participants than this across all events.')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    random.seed(args.seed)
+    logging.disable(logging.CRITICAL)
+    run(run_benchmarks(args.participants, args.events, args.max_participants, 'bench-info.json'))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,689 +1,1768 @@
 '''Written by Cael Shoop.'''
 
 import os
+import sys
+import json
+import logging
+import time
 import random
-import requests
 import timestamps
-from asyncio import Lock
+from queue import SimpleQueue
+from heapq import heappush, heappop
+from bisect import bisect_left, bisect_right
+from logging.handlers import QueueHandler, QueueListener
+from itertools import count
+from asyncio import Event as AsyncEvent, Queue, QueueFull, Semaphore, TimeoutError as AsyncTimeoutError, create_task, gather, get_running_loop, sleep, to_thread, wait_for
+from secrets import token_hex
+from functools import wraps
+from inspect import iscoroutinefunction
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from aiohttp import ClientSession, ClientTimeout, web
 from dotenv import load_dotenv
-from datetime import datetime, timedelta
-from discord import app_commands, Interaction, Intents, Client, ButtonStyle, EventStatus, EntityType, TextChannel, VoiceChannel, Message, ScheduledEvent, Guild, PrivacyLevel, utils, File
+from datetime import date, datetime, timedelta
+from discord import app_commands, Interaction, Intents, AutoShardedClient, ButtonStyle, EventStatus, EntityType, TextChannel, VoiceChannel, Message, ScheduledEvent, Guild, PrivacyLevel, utils, File, HTTPException, InteractionType
 from discord.ui import View, Button
 from discord.ext import tasks
 
 load_dotenv()
 
-
-def get_time():
-    ct = str(datetime.now())
-    hour = int(ct[11:13])
-    minute = int(ct[14:16])
-    return hour, minute
-
-def get_datetime_from_label(label: str):
-    partitioned_time = label.partition(':')
-    hour = int(partitioned_time[0])
-    minute = int(partitioned_time[2])
-    time = datetime.now().astimezone().replace(hour=hour, minute=minute, second=0, microsecond=0)
-    if time.hour < 2 and datetime.now().astimezone().hour > 6:
-        time += timedelta(days=1)
-    return time
-
-def get_log_time():
-    time = datetime.now().astimezone()
-    output = ''
-    if time.hour < 10:
-        output += '0'
-    output += f'{time.hour}:'
-    if time.minute < 10:
-        output += '0'
-    output += f'{time.minute}:'
-    if time.second < 10:
-        output += '0'
-    output += f'{time.second}'
-    return output
-
-def main():
-    class Participant():
-        class Availability:
-            def __init__(self):
-                self.thirteen_hundred            = False
-                self.thirteen_hundred_thirty     = False
-                self.fourteen_hundred            = False
-                self.fourteen_hundred_thirty     = False
-                self.fifteen_hundred             = False
-                self.fifteen_hundred_thirty      = False
-                self.sixteen_hundred             = False
-                self.sixteen_hundred_thirty      = False
-                self.seventeen_hundred           = False
-                self.seventeen_hundred_thirty    = False
-                self.eighteen_hundred            = False
-                self.eighteen_hundred_thirty     = False
-                self.nineteen_hundred            = False
-                self.nineteen_hundred_thirty     = False
-                self.twenty_hundred              = False
-                self.twenty_hundred_thirty       = False
-                self.twenty_one_hundred          = False
-                self.twenty_one_hundred_thirty   = False
-                self.twenty_two_hundred          = False
-                self.twenty_two_hundred_thirty   = False
-                self.twenty_three_hundred        = False
-                self.twenty_three_hundred_thirty = False
-                self.zero_hundred                = False
-                self.zero_hundred_thirty         = False
-                self.one_hundred                 = False
-                self.one_hundred_thirty          = False
-
-        def __init__(self, member):
-            self.member = member
-            self.availability = Participant.Availability()
-            self.answered = False
-            self.subscribed = True
-            self.weekly = False
-
-        def toggle_availability(self, label):
-            if label == timestamps.thirteen_hundred_hours:                 self.availability.thirteen_hundred               = not self.availability.thirteen_hundred
-            elif label == timestamps.thirteen_hundred_thirty_hours:        self.availability.thirteen_hundred_thirty        = not self.availability.thirteen_hundred_thirty
-            elif label == timestamps.fourteen_hundred_hours:               self.availability.fourteen_hundred               = not self.availability.fourteen_hundred
-            elif label == timestamps.fourteen_hundred_thirty_hours:        self.availability.fourteen_hundred_thirty        = not self.availability.fourteen_hundred_thirty
-            elif label == timestamps.fifteen_hundred_hours:                self.availability.fifteen_hundred                = not self.availability.fifteen_hundred
-            elif label == timestamps.fifteen_hundred_thirty_hours:         self.availability.fifteen_hundred_thirty         = not self.availability.fifteen_hundred_thirty
-            elif label == timestamps.sixteen_hundred_hours:                self.availability.sixteen_hundred                = not self.availability.sixteen_hundred
-            elif label == timestamps.sixteen_hundred_thirty_hours:         self.availability.sixteen_hundred_thirty         = not self.availability.sixteen_hundred_thirty
-            elif label == timestamps.seventeen_hundred_hours:              self.availability.seventeen_hundred              = not self.availability.seventeen_hundred
-            elif label == timestamps.seventeen_hundred_thirty_hours:       self.availability.seventeen_hundred_thirty       = not self.availability.seventeen_hundred_thirty
-            elif label == timestamps.eighteen_hundred_hours:               self.availability.eighteen_hundred               = not self.availability.eighteen_hundred
-            elif label == timestamps.eighteen_hundred_thirty_hours:        self.availability.eighteen_hundred_thirty        = not self.availability.eighteen_hundred_thirty
-            elif label == timestamps.nineteen_hundred_hours:               self.availability.nineteen_hundred               = not self.availability.nineteen_hundred
-            elif label == timestamps.nineteen_hundred_thirty_hours:        self.availability.nineteen_hundred_thirty        = not self.availability.nineteen_hundred_thirty
-            elif label == timestamps.twenty_hundred_hours:                 self.availability.twenty_hundred                 = not self.availability.twenty_hundred
-            elif label == timestamps.twenty_hundred_thirty_hours:          self.availability.twenty_hundred_thirty          = not self.availability.twenty_hundred_thirty
-            elif label == timestamps.twenty_one_hundred_hours:             self.availability.twenty_one_hundred             = not self.availability.twenty_one_hundred
-            elif label == timestamps.twenty_one_hundred_thirty_hours:      self.availability.twenty_one_hundred_thirty      = not self.availability.twenty_one_hundred_thirty
-            elif label == timestamps.twenty_two_hundred_hours:             self.availability.twenty_two_hundred             = not self.availability.twenty_two_hundred
-            elif label == timestamps.twenty_two_hundred_thirty_hours:      self.availability.twenty_two_hundred_thirty      = not self.availability.twenty_two_hundred_thirty
-            elif label == timestamps.twenty_three_hundred_hours:           self.availability.twenty_three_hundred           = not self.availability.twenty_three_hundred
-            elif label == timestamps.twenty_three_hundred_thirty_hours:    self.availability.twenty_three_hundred_thirty    = not self.availability.twenty_three_hundred_thirty
-            elif label == timestamps.zero_hundred_hours:                   self.availability.zero_hundred                   = not self.availability.zero_hundred
-            elif label == timestamps.zero_hundred_thirty_hours:            self.availability.zero_hundred_thirty            = not self.availability.zero_hundred_thirty
-            elif label == timestamps.one_hundred_hours:                    self.availability.one_hundred                    = not self.availability.one_hundred
-            elif label == timestamps.one_hundred_thirty_hours:             self.availability.one_hundred_thirty             = not self.availability.one_hundred_thirty
-
-        def is_available(self, label):
-            if label == timestamps.thirteen_hundred_hours:                 return self.availability.thirteen_hundred
-            elif label == timestamps.thirteen_hundred_thirty_hours:        return self.availability.thirteen_hundred_thirty
-            elif label == timestamps.fourteen_hundred_hours:               return self.availability.fourteen_hundred
-            elif label == timestamps.fourteen_hundred_thirty_hours:        return self.availability.fourteen_hundred_thirty
-            elif label == timestamps.fifteen_hundred_hours:                return self.availability.fifteen_hundred
-            elif label == timestamps.fifteen_hundred_thirty_hours:         return self.availability.fifteen_hundred_thirty
-            elif label == timestamps.sixteen_hundred_hours:                return self.availability.sixteen_hundred
-            elif label == timestamps.sixteen_hundred_thirty_hours:         return self.availability.sixteen_hundred_thirty
-            elif label == timestamps.seventeen_hundred_hours:              return self.availability.seventeen_hundred
-            elif label == timestamps.seventeen_hundred_thirty_hours:       return self.availability.seventeen_hundred_thirty
-            elif label == timestamps.eighteen_hundred_hours:               return self.availability.eighteen_hundred
-            elif label == timestamps.eighteen_hundred_thirty_hours:        return self.availability.eighteen_hundred_thirty
-            elif label == timestamps.nineteen_hundred_hours:               return self.availability.nineteen_hundred
-            elif label == timestamps.nineteen_hundred_thirty_hours:        return self.availability.nineteen_hundred_thirty
-            elif label == timestamps.twenty_hundred_hours:                 return self.availability.twenty_hundred
-            elif label == timestamps.twenty_hundred_thirty_hours:          return self.availability.twenty_hundred_thirty
-            elif label == timestamps.twenty_one_hundred_hours:             return self.availability.twenty_one_hundred
-            elif label == timestamps.twenty_one_hundred_thirty_hours:      return self.availability.twenty_one_hundred_thirty
-            elif label == timestamps.twenty_two_hundred_hours:             return self.availability.twenty_two_hundred
-            elif label == timestamps.twenty_two_hundred_thirty_hours:      return self.availability.twenty_two_hundred_thirty
-            elif label == timestamps.twenty_three_hundred_hours:           return self.availability.twenty_three_hundred
-            elif label == timestamps.twenty_three_hundred_thirty_hours:    return self.availability.twenty_three_hundred_thirty
-            elif label == timestamps.zero_hundred_hours:                   return self.availability.zero_hundred
-            elif label == timestamps.zero_hundred_thirty_hours:            return self.availability.zero_hundred_thirty
-            elif label == timestamps.one_hundred_hours:                    return self.availability.one_hundred
-            elif label == timestamps.one_hundred_thirty_hours:             return self.availability.one_hundred_thirty
-
-    class Event:
-        def __init__(self, name: str, entity_type: EntityType, voice_channel: VoiceChannel, participants: list, guild: Guild, text_channel: TextChannel, image_url: str, duration: int = 30, start_time: datetime = None): #, weekly: bool
-            self.name = name
-            self.guild = guild
-            self.entity_type = entity_type
-            self.og_message_text = f' wants to create an event called {self.name}. Check your DMs to share your availability!'
-            self.responded_message = None
-            self.text_channel = text_channel
-            self.voice_channel = voice_channel
-            self.privacy_level = PrivacyLevel.guild_only
-            self.participants = participants
-            self.image_url = image_url
-            #self.requested_weekly = weekly
-            self.buttons = []
-            self.reason = ''
-            self.nudges = ['respond', 'I showed you my event, pls respond', 'I\'m waiting for you', 'my brother in christ, click button(s)', 'your availability. hand it over', 'nudge', 'plz respond 🥺', 'I\'m literally crying rn omg, I need your availability', 'click button(s)', 'HURRY HURRY HURRY!', 'I want to create event: you sleep', 'I **NEED** AVAILABILITY!']
-            self.nudge_unresponded_timer = 30
-            self.ready_to_create = False
-            self.created = False
-            self.started = False
-            self.scheduled_event: ScheduledEvent = None
-            self.changed = False
-            self.start_time = start_time
-            if self.start_time:
-                self.end_time = self.start_time + timedelta(minutes=duration)
-            else:
-                self.end_time = None
-            self.duration = duration
-            self.valid = True
-
-        def check_times(self):
-            # Find first available shared time block and configure start/end times
-            print(f'{get_log_time()}> {self.name}> Comparing availabilities for {self.name}')
-            shared_time_slot = ''
-            if self.valid:
-                for time_slot in timestamps.all_timestamps:
-                    check_time_obj = get_datetime_from_label(time_slot)
-                    if datetime.now().astimezone() > check_time_obj:
-                        continue
-                    skip_time_slot = False
-                    for event in client.events:
-                        if self != event and check_time_obj == event.start_time and (self.shares_participants(event) or self.voice_channel == event.voice_channel):
-                            print(f'{get_log_time()}> {self.name}> Skipping {time_slot} due to event {event.name} already existing at that time with shared participant(s) or shared location')
-                            skip_time_slot = True
-                            break
-                    if not skip_time_slot:
-                        shared_availability = True
-                        for participant in self.participants:
-                            if participant.subscribed:
-                                shared_availability = shared_availability and participant.is_available(time_slot)
-                        if shared_availability:
-                            shared_time_slot = time_slot
-                            break
-            if shared_time_slot == '':
-                print(f'{get_log_time()}> {self.name}> Unable to find common availability')
-                self.valid = False
-                return
-            self.start_time = get_datetime_from_label(shared_time_slot)
-            self.end_time = self.start_time + timedelta(minutes=self.duration)
-            print(f'{get_log_time()}> {self.name}> Ready to create event on {self.start_time.month}/{self.start_time.day}/{self.start_time.year} at {self.start_time.hour}:{self.start_time.minute}')
-            self.ready_to_create = True
-
-        def shares_participants(self, event):
-            for self_participant in self.participants:
-                for other_participant in event.participants:
-                    if self_participant.member == other_participant.member:
-                        return True
-            return False
-
-        def has_everyone_answered(self):
-            for participant in self.participants:
-                if participant.subscribed and not participant.answered:
+logger = logging.getLogger('scheduler')
+
+MESSAGE_UPDATE_INTERVAL = float(os.getenv('MESSAGE_UPDATE_INTERVAL', '5'))
+SUBSCRIBER_CACHE_TTL = float(os.getenv('SUBSCRIBER_CACHE_TTL', '900'))
+CUSTOM_ID_PREFIX = 'scheduler'
+NUDGE_INTERVAL = 30
+RECONCILE_INTERVAL = 5
+# best attended slots offered as alternatives in quorum mode
+QUORUM_CANDIDATES = 3
+# a quorum event is placed before everyone answers once a slot reaches the quorum and either this share of subscribed
+# participants has answered or the poll has been open this many minutes, so late responders still get a say
+QUORUM_EARLY_RESPONSE_RATIO = 0.75
+QUORUM_EARLY_WAIT = 60
+JOBS_BUSY_MESSAGE = 'The bot is busy right now, please try again in a minute.'
+# guilds with at least this many events ready in the same tick are solved jointly in the solver processes
+JOINT_SOLVE_MIN_EVENTS = 2
+SOLVER_PROCESSES = int(os.getenv('SOLVER_PROCESSES', '2'))
+JOINT_SOLVE_MAX_STEPS = 200000
+METRICS_PORT = os.getenv('METRICS_PORT')
+METRICS_DUMP_INTERVAL = 10
+# slot grid offered in the availability DMs, SLOT_END may be past midnight
+SLOT_START = os.getenv('SLOT_START', timestamps.thirteen_hundred_hours)
+SLOT_END = os.getenv('SLOT_END', timestamps.one_hundred_thirty_hours)
+SLOT_MINUTES = int(os.getenv('SLOT_MINUTES', '30'))
+SLOT_HORIZON_DAYS = int(os.getenv('SLOT_HORIZON_DAYS', '1'))
+NUDGES = ['respond', 'I showed you my event, pls respond', 'I\'m waiting for you', 'my brother in christ, click button(s)', 'your availability. hand it over', 'nudge', 'plz respond 🥺', 'I\'m literally crying rn omg, I need your availability', 'click button(s)', 'HURRY HURRY HURRY!', 'I want to create event: you sleep', 'I **NEED** AVAILABILITY!']
+
+
+def normalize_event_name(name: str):
+    return name.strip().lower()
+
+def assign_slots(problems: list, slot_offsets: list, max_steps: int = JOINT_SOLVE_MAX_STEPS):
+    # problems holds (preferred slot indexes, duration in minutes, busy keys) per event, slot_offsets the start minute of each slot.
+    # Returns a slot index or None per event, placing as many events as possible without two events sharing a busy key
+    # overlapping, and otherwise taking each event's most preferred slots. Runs in the solver processes, so it only sees plain data.
+    order = sorted(range(len(problems)), key=lambda index: len(problems[index][0]))
+    occupied = {}
+    assignment = [None] * len(problems)
+    best = [-1, list(assignment)]
+    steps = 0
+
+    def fits(keys, start, end):
+        for key in keys:
+            for occupied_start, occupied_end in occupied.get(key, ()):
+                if occupied_start < end and start < occupied_end:
                     return False
-            return True
+        return True
 
-        async def dm_all_participants(self, interaction: Interaction, duration: int = 30, reschedule: bool = False):
-            curHour, curMinute = get_time()
-            curTimeObj = datetime(2000, 1, 1, curHour, curMinute).replace(second=0, microsecond=0)
-            for participant in self.participants:
-                buttonFlag = False
-                views = []
-                for button_label in timestamps.all_timestamps:
-                    labelTime = button_label.partition(':')
-                    labelHour = int(labelTime[0])
-                    labelMinute = int(labelTime[2])
-
-                    if not buttonFlag:
-                        labelTimeObj = datetime(2000, 1, 1, labelHour, labelMinute).replace(second=0, microsecond=0)
-                        if labelHour < 2:
-                            labelTimeObj += timedelta(days=1)
-                        buttonFlag = curTimeObj + timedelta(minutes=5) < labelTimeObj
-
-                    if buttonFlag:
-                        views.append(TimeButton(label=button_label, participant=participant, event=self))
-                views.append(OtherButtons(participant=participant, event=self))
-
-                print(f'{get_log_time()}> {self.name}> Sending buttons to {participant.member.name}')
-                async with client.msg_lock:
-                    if reschedule:
-                        await participant.member.send(f'⬇️⬇️⬇️⬇️⬇️ __**{self.name}**__ ⬇️⬇️⬇️⬇️⬇️\n**Loading buttons, please wait.**\n{interaction.user.name} wants to **reschedule** {self.name}.\nThe event will last {duration} minutes.')
-                    else:
-                        await participant.member.send(f'⬇️⬇️⬇️⬇️⬇️ __**{self.name}**__ ⬇️⬇️⬇️⬇️⬇️\n**Loading buttons, please wait.**\n{interaction.user.name} wants to create an event called {self.name}.\nThe event will last {duration} minutes.')
-                    for view in views:
-                        await participant.member.send(view=view)
-                    await participant.member.send(f'Select **all** of the 30 minute blocks you could be available to attend {self.name}!\n"None" will stop the event from being created, so click "Unsubscribe" if you want the event to occur with or without you.\n'
-                                                  f'The event will be either created or cancelled 1-2 minutes after the last person responds, which renders the buttons useless.\n'f'⬆️⬆️⬆️⬆️⬆️ __**{self.name}**__ ⬆️⬆️⬆️⬆️⬆️')
-            print(f'{get_log_time()}> {self.name}> Done DMing participants')
-
-        async def update_message(self):
-            if self.has_everyone_answered():
+    def search(position, placed):
+        nonlocal steps
+        # even placing every remaining event can't beat the best assignment so far
+        if placed + len(order) - position <= best[0]:
+            return
+        if position == len(order):
+            best[0], best[1] = placed, list(assignment)
+            return
+        steps += 1
+        if steps > max_steps:
+            return
+        index = order[position]
+        preferences, duration, keys = problems[index]
+        for slot in preferences:
+            start = slot_offsets[slot]
+            end = start + duration
+            if not fits(keys, start, end):
+                continue
+            for key in keys:
+                occupied.setdefault(key, []).append((start, end))
+            assignment[index] = slot
+            search(position + 1, placed + 1)
+            assignment[index] = None
+            for key in keys:
+                occupied[key].pop()
+            if best[0] == len(order):
+                return
+        search(position + 1, placed)
+
+    search(0, 0)
+    return best[1]
+
+class JsonFormatter(logging.Formatter):
+    # structured fields passed through a log call's extra argument
+    FIELDS = ('guild', 'event', 'participant', 'action')
+
+    def format(self, record: logging.LogRecord):
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S%z'),
+            'level': record.levelname,
+            'message': record.getMessage()
+        }
+        for field in self.FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = str(value)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+def setup_logging():
+    # log calls only enqueue records, the listener thread formats them and writes to stdout
+    log_queue = SimpleQueue()
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter())
+    listener = QueueListener(log_queue, handler)
+    logger.addHandler(QueueHandler(log_queue))
+    logger.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+    logger.propagate = False
+    listener.start()
+    return listener
+
+class Metrics:
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+    def __init__(self):
+        # (name, labels) -> value
+        self.counters = {}
+        # (name, labels) -> [count per bucket..., sum, count]
+        self.histograms = {}
+        # name -> callable returning the current value
+        self.gauges = {}
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = [0] * (len(self.BUCKETS) + 2)
+        for index, bucket in enumerate(self.BUCKETS):
+            if value <= bucket:
+                histogram[index] += 1
+        histogram[-2] += value
+        histogram[-1] += 1
+
+    def gauge(self, name: str, callback):
+        self.gauges[name] = callback
+
+    def timed(self, name: str, **labels):
+        def decorator(function):
+            if iscoroutinefunction(function):
+                @wraps(function)
+                async def timed_coroutine(*args, **kwargs):
+                    start = time.perf_counter()
+                    try:
+                        return await function(*args, **kwargs)
+                    finally:
+                        self.observe(name, time.perf_counter() - start, **labels)
+                return timed_coroutine
+
+            @wraps(function)
+            def timed_function(*args, **kwargs):
+                start = time.perf_counter()
                 try:
-                    await self.responded_message.edit(content=f'Everyone has responded.')
-                except Exception as e:
-                    print(f'{get_log_time()}> {self.name}> Error editing responded message with "everyone has responded": {e}')
+                    return function(*args, **kwargs)
+                finally:
+                    self.observe(name, time.perf_counter() - start, **labels)
+            return timed_function
+        return decorator
+
+    @staticmethod
+    def format_labels(labels: tuple, extra: tuple = ()):
+        labels = labels + extra
+        if not labels:
+            return ''
+        return '{' + ','.join(f'{label}="{value}"' for label, value in labels) + '}'
+
+    def render(self):
+        # Prometheus text exposition format
+        lines = []
+        for name in sorted({name for name, _ in self.counters}):
+            lines.append(f'# TYPE {name} counter')
+            for (counter_name, labels), value in self.counters.items():
+                if counter_name == name:
+                    lines.append(f'{name}{self.format_labels(labels)} {value}')
+        for name in sorted({name for name, _ in self.histograms}):
+            lines.append(f'# TYPE {name} histogram')
+            for (histogram_name, labels), histogram in self.histograms.items():
+                if histogram_name != name:
+                    continue
+                for index, bucket in enumerate(self.BUCKETS):
+                    lines.append(f'{name}_bucket{self.format_labels(labels, (("le", bucket),))} {histogram[index]}')
+                lines.append(f'{name}_bucket{self.format_labels(labels, (("le", "+Inf"),))} {histogram[-1]}')
+                lines.append(f'{name}_sum{self.format_labels(labels)} {histogram[-2]}')
+                lines.append(f'{name}_count{self.format_labels(labels)} {histogram[-1]}')
+        for name, callback in sorted(self.gauges.items()):
+            lines.append(f'# TYPE {name} gauge')
+            lines.append(f'{name} {callback()}')
+        return '\n'.join(lines) + '\n'
+
+    async def serve(self, port: int):
+        async def handle_metrics(request):
+            return web.Response(text=self.render(), content_type='text/plain')
+        app = web.Application()
+        app.router.add_get('/metrics', handle_metrics)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, '127.0.0.1', port).start()
+        logger.info('Serving metrics on http://127.0.0.1:%s/metrics', port)
+
+
+class RateLimitCounter(logging.Handler):
+    # discord.py retries 429s itself and only reports them through its logger
+    def emit(self, record: logging.LogRecord):
+        if 'rate limited' in record.getMessage().lower():
+            metrics.inc('scheduler_rate_limits_total', source='discord.py')
+
+
+metrics = Metrics()
+slot_calendar = timestamps.SlotCalendar(SLOT_START, SLOT_END, SLOT_MINUTES, SLOT_HORIZON_DAYS)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+            self.last_refill = now
+            if self.tokens >= 1:
+                self.tokens -= 1
                 return
+            await sleep((1 - self.tokens) / self.rate)
+
+
+class DMDispatcher:
+    # Discord documents a global limit of 50 requests per second, sends take half of it to leave room for everything else.
+    # Message routes are also limited per channel with limits only reported in response headers, so each recipient's
+    # DM channel gets its own conservative bucket. discord.py already waits out the 429s it is told about.
+    MAX_CONCURRENT_SENDS = 10
+    SENDS_PER_SECOND = 25
+    RECIPIENT_SENDS_PER_SECOND = 1
+    RECIPIENT_BURST = 5
+    MAX_RECIPIENT_BUCKETS = 1000
+    MAX_RETRIES = 3
+
+    def __init__(self):
+        self.semaphore = Semaphore(self.MAX_CONCURRENT_SENDS)
+        self.bucket = TokenBucket(self.SENDS_PER_SECOND, self.SENDS_PER_SECOND)
+        self.recipient_rate = self.RECIPIENT_SENDS_PER_SECOND
+        self.recipient_burst = self.RECIPIENT_BURST
+        # member id -> bucket for that member's DM channel, least recently used first
+        self.recipient_buckets = OrderedDict()
+
+    def get_recipient_bucket(self, member):
+        bucket = self.recipient_buckets.get(member.id)
+        if bucket is None:
+            bucket = self.recipient_buckets[member.id] = TokenBucket(self.recipient_rate, self.recipient_burst)
+            if len(self.recipient_buckets) > self.MAX_RECIPIENT_BUCKETS:
+                self.recipient_buckets.popitem(last=False)
+        else:
+            self.recipient_buckets.move_to_end(member.id)
+        return bucket
+
+    async def send(self, member, content: str = None, view: View = None):
+        recipient_bucket = self.get_recipient_bucket(member)
+        async with self.semaphore:
+            for attempt in range(self.MAX_RETRIES + 1):
+                await recipient_bucket.acquire()
+                await self.bucket.acquire()
+                start = time.perf_counter()
+                try:
+                    if view:
+                        message = await member.send(content, view=view)
+                    else:
+                        message = await member.send(content)
+                    metrics.observe('scheduler_dm_send_seconds', time.perf_counter() - start)
+                    return message
+                except HTTPException as e:
+                    # only reached once discord.py has given up on its own retries
+                    if e.status != 429 or attempt == self.MAX_RETRIES:
+                        raise
+                    metrics.inc('scheduler_rate_limits_total', source='dm')
+                    backoff = 2 ** attempt
+                    logger.warning('Rate limited sending DM to %s, retrying in %s seconds', member.name, backoff, extra={'participant': member.name})
+                    await sleep(backoff)
+
+    async def send_all(self, messages: list):
+        # messages is a list of (member, content, view) tuples, sent concurrently
+        async def send_logged(member, content, view):
             try:
-                mentions = ''
-                for participant in self.participants:
-                    if participant.subscribed and not participant.answered:
-                        mentions += f'{participant.member.mention} '
-                mentions = '\nWaiting for a response from these participants:\n' + mentions
+                await self.send(member, content, view)
             except Exception as e:
-                print(f'{get_log_time()}> {self.name}> Error generating mentions list for responded message: {e}')
+                logger.error('Error sending DM to %s: %s', member.name, e, extra={'participant': member.name})
+        await gather(*(send_logged(member, content, view) for member, content, view in messages))
+
+    async def broadcast(self, members: list, content: str):
+        await self.send_all([(member, content, None) for member in members])
+
+
+class DeadlineScheduler:
+    def __init__(self):
+        # heap of (deadline, sequence, callback), the sequence breaks ties between equal deadlines
+        self.deadlines = []
+        self.sequence = count()
+        self.wakeup = None
+        self.task = None
+        # running callbacks, referenced so they can't be garbage collected mid-run
+        self.callback_tasks = set()
+
+    def schedule(self, deadline: datetime, callback):
+        heappush(self.deadlines, (deadline, next(self.sequence), callback))
+        # wake the runner if this is now the earliest deadline
+        if self.wakeup and self.deadlines[0][2] is callback:
+            self.wakeup.set()
+
+    def start(self):
+        if self.task is None:
+            self.wakeup = AsyncEvent()
+            self.task = create_task(self.run())
+
+    async def run(self):
+        while True:
+            now = datetime.now().astimezone()
+            while self.deadlines and self.deadlines[0][0] <= now:
+                deadline, sequence, callback = heappop(self.deadlines)
+                # each callback runs on its own so a slow DM fan-out or rate limited send can't delay other deadlines
+                task = create_task(self.run_callback(deadline, callback))
+                self.callback_tasks.add(task)
+                task.add_done_callback(self.callback_tasks.discard)
+            self.wakeup.clear()
+            timeout = (self.deadlines[0][0] - datetime.now().astimezone()).total_seconds() if self.deadlines else None
             try:
-                await self.responded_message.edit(content=f'{mentions}')
-            except Exception as e:
-                print(f'{get_log_time()}> {self.name}> Error editing responded message: {e}')
+                await wait_for(self.wakeup.wait(), timeout)
+            except AsyncTimeoutError:
+                pass
 
-        def nudge_timer(self):
-            self.nudge_unresponded_timer -= 1
-            if self.nudge_unresponded_timer == 0:
-                self.nudge_unresponded_timer = 30
-                return True
+    async def run_callback(self, deadline: datetime, callback):
+        try:
+            await callback()
+        except Exception as e:
+            logger.error('Error running deadline for %s: %s', deadline, e)
+
+
+class JobQueue:
+    # Slow command work runs here after the command has deferred, so the interaction is answered well inside Discord's 3 seconds
+    MAX_PENDING_JOBS = 100
+    WORKERS = 4
+
+    def __init__(self):
+        self.queue = Queue(maxsize=self.MAX_PENDING_JOBS)
+        self.tasks = []
+
+    def start(self):
+        if not self.tasks:
+            self.tasks = [create_task(self.work()) for _ in range(self.WORKERS)]
+
+    def submit(self, name: str, job):
+        # job is a coroutine, it is closed instead of queued when the queue is full
+        try:
+            self.queue.put_nowait((name, job))
+        except QueueFull:
+            job.close()
+            metrics.inc('scheduler_jobs_rejected_total', job=name)
             return False
+        return True
 
-        async def nudge_unresponded_participants(self):
-            if not self.nudge_timer() or self.created or self.has_everyone_answered():
+    async def work(self):
+        while True:
+            name, job = await self.queue.get()
+            start = time.perf_counter()
+            try:
+                await job
+            except Exception as e:
+                logger.error('Error running %s job: %s', name, e)
+            metrics.observe('scheduler_job_seconds', time.perf_counter() - start, job=name)
+
+
+class IntervalIndex:
+    def __init__(self):
+        # (start, end, event) sorted by start, starts is kept alongside for bisecting
+        self.intervals = []
+        self.starts = []
+        # no interval is longer than this, so overlap queries only need to scan starts in [start - longest, end)
+        self.longest = timedelta()
+
+    def __len__(self):
+        return len(self.intervals)
+
+    def add(self, start: datetime, end: datetime, event):
+        index = bisect_right(self.starts, start)
+        self.starts.insert(index, start)
+        self.intervals.insert(index, (start, end, event))
+        self.longest = max(self.longest, end - start)
+
+    def remove(self, start: datetime, event):
+        index = bisect_left(self.starts, start)
+        while index < len(self.starts) and self.starts[index] == start:
+            if self.intervals[index][2] is event:
+                del self.starts[index]
+                del self.intervals[index]
                 return
+            index += 1
+
+    def overlapping(self, start: datetime, end: datetime):
+        first = bisect_right(self.starts, start - self.longest)
+        last = bisect_left(self.starts, end)
+        for interval_start, interval_end, event in self.intervals[first:last]:
+            if interval_end > start:
+                yield interval_start, interval_end, event
+
+
+class ImageCache:
+    MAX_ENTRIES = 32
+    MAX_IMAGE_BYTES = 8 * 1024 * 1024
+    FETCH_TIMEOUT = 10
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self):
+        # url -> image bytes, least recently used first
+        self.images = OrderedDict()
+        self.session = None
+
+    async def get(self, url: str):
+        if url in self.images:
+            self.images.move_to_end(url)
+            return self.images[url]
+        if self.session is None:
+            self.session = ClientSession(timeout=ClientTimeout(total=self.FETCH_TIMEOUT))
+        async with self.session.get(url) as response:
+            if response.status != 200:
+                return None
+            if response.content_length and response.content_length > self.MAX_IMAGE_BYTES:
+                return None
+            image = bytearray()
+            async for chunk in response.content.iter_chunked(self.CHUNK_SIZE):
+                image += chunk
+                if len(image) > self.MAX_IMAGE_BYTES:
+                    return None
+        self.images[url] = bytes(image)
+        if len(self.images) > self.MAX_ENTRIES:
+            self.images.popitem(last=False)
+        return self.images[url]
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+
+# set by main(), benchmarks install their own
+client = None
+
+
+class Participant():
+    def __init__(self, member):
+        self.member = member
+        # bit i is set when the participant is available at slot_calendar.labels[i]
+        self.availability = 0
+        self.answered = False
+        self.subscribed = True
+        self.weekly = False
+        # state of this participant's availability buttons
+        self.page = 0
+        self.all_selected = False
+        self.none_selected = False
+
+    def to_dict(self):
+        return {
+            'member_id': self.member.id,
+            'availability': self.availability,
+            'answered': self.answered,
+            'subscribed': self.subscribed,
+            'weekly': self.weekly,
+            'page': self.page,
+            'all_selected': self.all_selected,
+            'none_selected': self.none_selected
+        }
+
+    @staticmethod
+    def from_dict(data: dict, guild: Guild):
+        member = guild.get_member(data['member_id']) or client.get_user(data['member_id'])
+        if member is None:
+            return None
+        participant = Participant(member)
+        participant.availability = data['availability']
+        participant.answered = data['answered']
+        participant.subscribed = data['subscribed']
+        participant.weekly = data['weekly']
+        participant.page = data['page']
+        participant.all_selected = data['all_selected']
+        participant.none_selected = data['none_selected']
+        return participant
+
+    def toggle_availability(self, label):
+        index = slot_calendar.index.get(label)
+        if index is not None:
+            self.availability ^= 1 << index
+
+    def is_available(self, label):
+        index = slot_calendar.index.get(label)
+        if index is None:
+            return False
+        return bool(self.availability >> index & 1)
+
+    def set_full_availability(self):
+        self.availability = slot_calendar.mask
+
+    def clear_availability(self):
+        self.availability = 0
+
+
+class Event:
+    def __init__(self, name: str, entity_type: EntityType, voice_channel: VoiceChannel, participants: list, guild: Guild, text_channel: TextChannel, image_url: str, duration: int = 30, start_time: datetime = None): #, weekly: bool
+        self.id = token_hex(4)
+        self.name = name
+        self.guild = guild
+        self.entity_type = entity_type
+        self.og_message_text = f' wants to create an event called {self.name}. Check your DMs to share your availability!'
+        self.responded_message = None
+        self.responded_content = ''
+        self.message_update_pending = False
+        # keep a reference so the pending flush can't be garbage collected
+        self.message_update_task = None
+        self.text_channel = text_channel
+        self.voice_channel = voice_channel
+        self.privacy_level = PrivacyLevel.guild_only
+        self.participants = []
+        # member id -> participant
+        self.participants_by_id = {}
+        self.tracked = False
+        for participant in participants:
+            self.add_participant(participant)
+        self.image_url = image_url
+        #self.requested_weekly = weekly
+        self.reason = ''
+        self.next_nudge_time = None
+        self.warning_start_time = None
+        self.ready_to_create = False
+        self.created = False
+        self.started = False
+        self.scheduled_event: ScheduledEvent = None
+        self.changed = False
+        self.start_time = start_time
+        if self.start_time:
+            self.end_time = self.start_time + timedelta(minutes=duration)
+        else:
+            self.end_time = None
+        self.duration = duration
+        self.valid = True
+        # time slot labels offered in the availability DMs
+        self.time_slots = []
+        # 'end', 'reschedule' or 'cancel' once the event buttons have closed the event
+        self.closed_by = ''
+        # (start, end, keys) this event is indexed under in client.busy_intervals
+        self.busy_interval = None
+        # quorum mode picks the best attended slot with at least this many attendees instead of requiring everyone
+        self.quorum = 0
+        # member ids that must be able to attend in quorum mode
+        self.required_ids = set()
+        # (slot index, attendee count) of the best slots found by the last quorum solve
+        self.candidates = []
+        # availability bits are relative to this scheduling day's slot grid
+        self.day = slot_calendar.get_day()
+        self.poll_time = datetime.now().astimezone()
+
+    def to_dict(self):
+        if isinstance(self.voice_channel, str):
+            location = self.voice_channel
+        else:
+            location = self.voice_channel.id if self.voice_channel else None
+        return {
+            'id': self.id,
+            'name': self.name,
+            'guild_id': self.guild.id,
+            'entity_type': self.entity_type.value,
+            'location': location,
+            'text_channel_id': self.text_channel.id if self.text_channel else None,
+            'image_url': self.image_url,
+            'duration': self.duration,
+            'start_time': self.start_time.isoformat() if self.start_time else None,
+            'end_time': self.end_time.isoformat() if self.end_time else None,
+            'time_slots': self.time_slots,
+            'og_message_text': self.og_message_text,
+            'responded_message_id': self.responded_message.id if self.responded_message else None,
+            'responded_content': self.responded_content,
+            'reason': self.reason,
+            'created': self.created,
+            'started': self.started,
+            'valid': self.valid,
+            'day': self.day.isoformat(),
+            'poll_time': self.poll_time.isoformat(),
+            'quorum': self.quorum,
+            'required_ids': list(self.required_ids),
+            'scheduled_event_id': self.scheduled_event.id if self.scheduled_event else None,
+            'participants': [participant.to_dict() for participant in self.participants]
+        }
+
+    @staticmethod
+    def from_dict(data: dict):
+        guild = client.get_guild(data['guild_id'])
+        if guild is None:
+            return None
+        entity_type = EntityType(data['entity_type'])
+        if entity_type == EntityType.external:
+            location = data['location']
+        else:
+            location = client.get_channel(data['location'])
+        text_channel = client.get_channel(data['text_channel_id']) if data['text_channel_id'] else None
+        participants = []
+        for participant_data in data['participants']:
+            participant = Participant.from_dict(participant_data, guild)
+            if participant:
+                participants.append(participant)
+        start_time = datetime.fromisoformat(data['start_time']) if data['start_time'] else None
+        event = Event(data['name'], entity_type, location, participants, guild, text_channel, data['image_url'], data['duration'], start_time)
+        if data['end_time']:
+            event.end_time = datetime.fromisoformat(data['end_time'])
+        event.id = data['id']
+        event.time_slots = data['time_slots']
+        event.og_message_text = data['og_message_text']
+        if text_channel and data['responded_message_id']:
+            event.responded_message = text_channel.get_partial_message(data['responded_message_id'])
+        event.responded_content = data['responded_content']
+        event.reason = data['reason']
+        event.started = data['started']
+        event.valid = data['valid']
+        event.day = date.fromisoformat(data['day']) if data.get('day') else None
+        if data.get('poll_time'):
+            event.poll_time = datetime.fromisoformat(data['poll_time'])
+        event.quorum = data.get('quorum', 0)
+        event.required_ids = set(data.get('required_ids', []))
+        if data['created']:
+            event.scheduled_event = guild.get_scheduled_event(data['scheduled_event_id'])
+            if event.scheduled_event is None:
+                return None
+            event.created = True
+        return event
+
+    @metrics.timed('scheduler_operation_seconds', operation='check_times')
+    def check_times(self, final: bool = True):
+        # Find first available shared time block and configure start/end times, an early quorum solve that finds none keeps waiting
+        logger.debug('Comparing availabilities for %s', self.name, extra={'event': self.name})
+        shared_slots = 0
+        if self.valid:
+            now = datetime.now().astimezone()
+            slot_times = slot_calendar.get_times(self.day)
+            shared_slots = self.get_open_slots(now, slot_times)
+            if self.quorum:
+                shared_slots = self.get_quorum_slot(shared_slots)
+        if not shared_slots:
+            if final:
+                self.invalidate()
+            return
+        # lowest set bit is the earliest shared slot
+        self.set_start_slot(slot_times, (shared_slots & -shared_slots).bit_length() - 1)
+
+    def get_open_slots(self, now: datetime, slot_times: list):
+        # Future slots without conflicts, in unanimous mode also limited to slots every subscribed participant is available at
+        open_slots = slot_calendar.get_future_mask(now, self.day)
+        open_slots &= ~self.get_conflicting_slots(slot_times)
+        if not self.quorum:
             for participant in self.participants:
-                if not participant.answered:
-                    await participant.member.send(random.choice(self.nudges))
-                    print(f'{get_log_time()}> {self.name}> Nudged {participant.member.name}')
-
-        async def remove(self):
-            client.events.remove(self)
-
-    class TimeButton(View):
-        def __init__(self, label: str, participant: Participant, event: Event):
-            super().__init__(timeout=None)
-            self.label = label
-            self.participant = participant
-            self.event = event
-            self.add_button()
-
-        def add_button(self):
-            button = Button(label=self.label + ' EST', style=ButtonStyle.red)
-            async def button_callback(interaction: Interaction):
-                self.event.changed = True
-                self.event.ready_to_create = False
-                self.participant.answered = True
-                await self.event.update_message()
-                self.participant.toggle_availability(self.label)
-                if self.participant.is_available(self.label):
-                    button.style = ButtonStyle.green
+                if participant.subscribed:
+                    open_slots &= participant.availability
+        return open_slots
+
+    def get_preferred_slots(self, now: datetime, slot_times: list):
+        # slot indexes this event could take, most preferred first
+        open_slots = self.get_open_slots(now, slot_times)
+        if self.quorum:
+            self.candidates = self.get_best_slots(open_slots, len(slot_times))
+            return [index for index, attendance in self.candidates]
+        return [index for index in range(len(slot_times)) if open_slots >> index & 1]
+
+    def invalidate(self):
+        logger.info('Unable to find common availability', extra={'event': self.name})
+        if self.quorum:
+            self.reason += f'No time slot had at least {self.quorum} available participants. '
+        self.valid = False
+
+    def set_start_slot(self, slot_times: list, index: int):
+        self.start_time = slot_times[index]
+        self.end_time = self.start_time + timedelta(minutes=self.duration)
+        if self.tracked:
+            client.index_busy(self)
+        logger.info('Ready to create event on %s/%s/%s at %s:%s', self.start_time.month, self.start_time.day, self.start_time.year, self.start_time.hour, self.start_time.minute, extra={'event': self.name})
+        self.ready_to_create = True
+
+    def get_attendance(self, slots: int):
+        # Bit-sliced counters: bit i of planes[k] is bit k of the number of subscribed participants available at slot i,
+        # so each participant is added to every slot at once with a few integer operations
+        planes = []
+        for participant in self.participants:
+            if not participant.subscribed:
+                continue
+            carry = participant.availability & slots
+            bit = 0
+            while carry:
+                if bit == len(planes):
+                    planes.append(0)
+                planes[bit], carry = planes[bit] ^ carry, planes[bit] & carry
+                bit += 1
+        attendance = {}
+        while slots:
+            index = (slots & -slots).bit_length() - 1
+            attendance[index] = sum((plane >> index & 1) << bit for bit, plane in enumerate(planes))
+            slots &= slots - 1
+        return attendance
+
+    def get_best_slots(self, slots: int, count: int = QUORUM_CANDIDATES):
+        # best attended slots reaching the quorum, earliest first among equal attendance
+        for member_id in self.required_ids:
+            participant = self.participants_by_id.get(member_id)
+            if participant and participant.subscribed:
+                slots &= participant.availability
+        attendance = self.get_attendance(slots)
+        indexes = sorted((index for index in attendance if attendance[index] >= self.quorum), key=lambda index: (-attendance[index], index))
+        return [(index, attendance[index]) for index in indexes[:count]]
+
+    def get_quorum_slot(self, slots: int):
+        self.candidates = self.get_best_slots(slots)
+        if not self.candidates:
+            return 0
+        return 1 << self.candidates[0][0]
+
+    def get_conflicting_slots(self, slot_times):
+        # Mask of slots where this event would overlap another event with shared participant(s) or shared location
+        conflicting_slots = 0
+        window_end = slot_times[-1] + timedelta(minutes=self.duration)
+        for start, end, event in client.get_conflicting_intervals(self, slot_times[0], window_end):
+            logger.debug('Skipping slots overlapping event %s from %s to %s with shared participant(s) or shared location', event.name, start, end, extra={'event': self.name})
+            conflicting_slots |= slot_calendar.get_overlap_mask(start, end, self.duration, self.day)
+        return conflicting_slots
+
+    def add_participant(self, participant):
+        self.participants.append(participant)
+        self.participants_by_id[participant.member.id] = participant
+        if self.tracked:
+            client.index_busy_member(self, participant.member.id)
+
+    def set_participants(self, participants):
+        if self.tracked:
+            client.unindex_busy(self)
+        self.participants = []
+        self.participants_by_id = {}
+        for participant in participants:
+            self.add_participant(participant)
+        if self.tracked:
+            client.index_busy(self)
+
+    @property
+    def member_ids(self):
+        return self.participants_by_id.keys()
+
+    def has_participant(self, member):
+        return member.id in self.member_ids
+
+    def sync_participants(self, members: list):
+        # Keep existing Participant objects (and their availability), add new members and drop missing ones
+        member_ids = {member.id for member in members}
+        if member_ids == self.member_ids:
+            return
+        participants = [participant for participant in self.participants if participant.member.id in member_ids]
+        for member in members:
+            if member.id not in self.member_ids:
+                participants.append(Participant(member))
+        self.set_participants(participants)
+
+    def remove_participant(self, member):
+        if member.id not in self.member_ids:
+            return
+        self.set_participants([participant for participant in self.participants if participant.member.id != member.id])
+
+    def get_participant(self, member):
+        return self.participants_by_id.get(member.id)
+
+    def get_custom_id(self, action: str, arg=None):
+        if arg is None:
+            return f'{CUSTOM_ID_PREFIX}:{self.id}:{action}'
+        return f'{CUSTOM_ID_PREFIX}:{self.id}:{action}:{arg}'
+
+    def is_ready_to_solve(self):
+        if self.has_everyone_answered():
+            return True
+        if not self.quorum:
+            return False
+        now = datetime.now().astimezone()
+        subscribed = [participant for participant in self.participants if participant.subscribed]
+        answered = sum(participant.answered for participant in subscribed)
+        if answered < QUORUM_EARLY_RESPONSE_RATIO * len(subscribed) and now - self.poll_time < timedelta(minutes=QUORUM_EARLY_WAIT):
+            return False
+        # non-responders count as unavailable, so the quorum must already be met on a slot that is still open
+        return bool(self.get_best_slots(self.get_open_slots(now, slot_calendar.get_times(self.day)), 1))
+
+    def has_everyone_answered(self):
+        for participant in self.participants:
+            if participant.subscribed and not participant.answered:
+                return False
+        return True
+
+    @metrics.timed('scheduler_operation_seconds', operation='dm_all_participants')
+    async def dm_all_participants(self, interaction: Interaction, duration: int = 30, reschedule: bool = False):
+        time_slots = slot_calendar.get_labels_after(minutes=5)
+
+        if reschedule:
+            header = f'__**{self.name}**__\n{interaction.user.name} wants to **reschedule** {self.name}.\nThe event will last {duration} minutes.\n'
+        else:
+            header = f'__**{self.name}**__\n{interaction.user.name} wants to create an event called {self.name}.\nThe event will last {duration} minutes.\n'
+        instructions = (f'Select **all** of the {SLOT_MINUTES} minute blocks you could be available to attend {self.name}!\n"None" will stop the event from being created, so click "Unsubscribe" if you want the event to occur with or without you.\n'
+                        f'The event will be either created or cancelled 1-2 minutes after the last person responds, which renders the buttons useless.')
+        logger.info('Sending buttons to %s participants', len(self.participants), extra={'event': self.name})
+        self.time_slots = time_slots
+        await client.dm_dispatcher.send_all([(participant.member, header + instructions, AvailabilityView(participant, self)) for participant in self.participants])
+        logger.info('Done DMing participants', extra={'event': self.name})
+
+    async def update_message(self):
+        # Coalesce responded message edits, flushing at most once per MESSAGE_UPDATE_INTERVAL
+        if self.responded_message is None or self.message_update_pending:
+            return
+        self.message_update_pending = True
+        self.message_update_task = create_task(self.flush_message_update())
+
+    async def flush_message_update(self):
+        await sleep(MESSAGE_UPDATE_INTERVAL)
+        self.message_update_pending = False
+        if self.has_everyone_answered():
+            content = 'Everyone has responded.'
+        else:
+            mentions = ''
+            for participant in self.participants:
+                if participant.subscribed and not participant.answered:
+                    mentions += f'{participant.member.mention} '
+            content = '\nWaiting for a response from these participants:\n' + mentions
+        if content == self.responded_content:
+            return
+        try:
+            await self.responded_message.edit(content=content)
+            self.responded_content = content
+        except Exception as e:
+            logger.error('Error editing responded message: %s', e, extra={'event': self.name})
+
+    def schedule_deadlines(self):
+        if self.created:
+            self.schedule_warning()
+        else:
+            self.schedule_nudge()
+            client.deadlines.schedule(slot_calendar.get_last_time(self.day), self.expire)
+
+    def schedule_nudge(self):
+        nudge_time = datetime.now().astimezone() + timedelta(minutes=NUDGE_INTERVAL)
+        self.next_nudge_time = nudge_time
+        client.deadlines.schedule(nudge_time, lambda: self.nudge_unresponded_participants(nudge_time))
+
+    def schedule_warning(self):
+        if not self.start_time or self.start_time == self.warning_start_time:
+            return
+        start_time = self.start_time
+        self.warning_start_time = start_time
+        client.deadlines.schedule(start_time - timedelta(minutes=5), lambda: self.send_warning(start_time))
+
+    async def nudge_unresponded_participants(self, nudge_time: datetime):
+        if not self.tracked or self.created or nudge_time != self.next_nudge_time:
+            return
+        self.schedule_nudge()
+        if self.has_everyone_answered():
+            return
+        unanswered = [participant for participant in self.participants if not participant.answered]
+        await client.dm_dispatcher.send_all([(participant.member, random.choice(NUDGES), None) for participant in unanswered])
+        for participant in unanswered:
+            logger.info('Nudged %s', participant.member.name, extra={'event': self.name, 'participant': participant.member.name})
+
+    async def send_warning(self, start_time: datetime):
+        # skip warnings for events that were removed, started or moved since this one was scheduled
+        if not self.tracked or not self.created or self.started or start_time != self.start_time:
+            return
+        if self.scheduled_event.status != EventStatus.scheduled or datetime.now().astimezone() >= start_time:
+            return
+        if self.text_channel:
+            try:
+                await self.text_channel.send(f'**5 minute warning!** {self.name} is scheduled to start in 5 minutes.')
+            except Exception as e:
+                logger.error('Error sending 5 minute nudge: %s', e, extra={'event': self.name})
+        else:
+            await client.dm_dispatcher.broadcast([participant.member for participant in self.participants], f'**5 minute warning!** {self.name} is scheduled to start in 5 minutes.')
+
+    async def expire(self):
+        if self.tracked and not self.created:
+            await self.remove()
+            logger.info('last time slot passed, removed event from memory', extra={'event': self.name})
+
+    async def remove(self):
+        client.remove_event(self)
+
+
+class AvailabilityView(View):
+    # 4 rows of time slot buttons per page, last row holds All/None/Unsubscribe and page navigation
+    TIME_SLOTS_PER_PAGE = 20
+
+    def __init__(self, participant: Participant, event: Event):
+        super().__init__(timeout=None)
+        self.all_label = "All"
+        self.none_label = "None"
+        self.unsub_label = "Unsubscribe"
+        self.weekly_label = "Can Attend Weekly"
+        self.participant = participant
+        self.event = event
+        self.page_count = max(1, -(-len(self.event.time_slots) // self.TIME_SLOTS_PER_PAGE))
+        self.page = min(max(self.participant.page, 0), self.page_count - 1)
+        page_start = self.page * self.TIME_SLOTS_PER_PAGE
+        for index, label in enumerate(self.event.time_slots[page_start:page_start + self.TIME_SLOTS_PER_PAGE]):
+            self.add_time_button(label, row=index // 5)
+        self.add_all_button()
+        self.add_none_button()
+        self.add_unsub_button()
+        # if self.event.requested_weekly:
+        #     self.add_weekly_button()
+        if self.page_count > 1:
+            self.add_page_buttons()
+        # presses are routed by custom_id in on_interaction, so keep discord.py from storing this view
+        self.stop()
+
+    def add_time_button(self, label: str, row: int):
+        if self.participant.is_available(label):
+            style = ButtonStyle.green
+        else:
+            style = ButtonStyle.red
+        self.add_item(Button(label=label + ' EST', style=style, row=row, custom_id=self.event.get_custom_id('slot', slot_calendar.index[label])))
+
+    def add_all_button(self):
+        if self.participant.all_selected:
+            style = ButtonStyle.green
+        else:
+            style = ButtonStyle.blurple
+        self.add_item(Button(label=self.all_label, style=style, row=4, custom_id=self.event.get_custom_id('all')))
+
+    def add_none_button(self):
+        if self.participant.none_selected:
+            style = ButtonStyle.gray
+        else:
+            style = ButtonStyle.blurple
+        self.add_item(Button(label=self.none_label, style=style, row=4, custom_id=self.event.get_custom_id('none')))
+
+    def add_unsub_button(self):
+        if self.participant.subscribed:
+            style = ButtonStyle.blurple
+        else:
+            style = ButtonStyle.gray
+        self.add_item(Button(label=self.unsub_label, style=style, row=4, custom_id=self.event.get_custom_id('unsub')))
+
+    def add_page_buttons(self):
+        self.add_item(Button(label='◀', style=ButtonStyle.gray, row=4, disabled=self.page == 0, custom_id=self.event.get_custom_id('page', self.page - 1)))
+        self.add_item(Button(label='▶', style=ButtonStyle.gray, row=4, disabled=self.page == self.page_count - 1, custom_id=self.event.get_custom_id('page', self.page + 1)))
+
+    # def add_weekly_button(self):
+    #     self.add_item(Button(label=self.weekly_label, style=ButtonStyle.green if self.participant.weekly else ButtonStyle.gray, custom_id=self.event.get_custom_id('weekly')))
+
+    @staticmethod
+    async def handle(interaction: Interaction, event: Event, action: str, arg: str):
+        participant = event.get_participant(interaction.user)
+        if participant is None:
+            await interaction.response.send_message(f'You are not a participant in {event.name}.', ephemeral=True)
+            return
+        if action == 'page':
+            participant.page = int(arg)
+        else:
+            event.changed = True
+            event.ready_to_create = False
+            participant.answered = True
+            await event.update_message()
+            if action == 'slot':
+                label = slot_calendar.labels[int(arg)]
+                participant.toggle_availability(label)
+                logger.debug('%s toggled availability to %s at %s', participant.member.name, participant.is_available(label), label, extra={'event': event.name, 'participant': participant.member.name})
+            elif action == 'all':
+                participant.all_selected = not participant.all_selected
+                if participant.all_selected:
+                    participant.set_full_availability()
+                    logger.info('%s selected full availability', participant.member.name, extra={'event': event.name, 'participant': participant.member.name})
                 else:
-                    button.style = ButtonStyle.red
-                try:
-                    await interaction.response.edit_message(view=self)
-                except Exception as e:
-                    print(f'{get_log_time()}> Error editing response to {self.label} button press by {self.participant.member.name}: {e}')
-                print(f'{get_log_time()}> {self.event.name}> {self.participant.member.name} toggled availability to {self.participant.is_available(self.label)} at {self.label}')
-
-            button.callback = button_callback
-            self.add_item(button)
-
-    class OtherButtons(View):
-        def __init__(self, participant: Participant, event: Event):
-            super().__init__(timeout=None)
-            self.all_label = "All"
-            self.none_label = "None"
-            self.unsub_label = "Unsubscribe"
-            self.weekly_label = "Can Attend Weekly"
-            self.participant = participant
-            self.event = event
-            self.add_all_button()
-            self.add_none_button()
-            self.add_unsub_button()
-            # if self.event.requested_weekly:
-            #     self.add_weekly_button()
-
-        def add_all_button(self):
-            button = Button(label=self.all_label, style=ButtonStyle.blurple)
-            async def all_button_callback(interaction: Interaction):
-                self.event.changed = True
-                self.event.ready_to_create = False
-                self.participant.answered = True
-                await self.event.update_message()
-                if button.style == ButtonStyle.blurple:
-                    button.style = ButtonStyle.green
-                    for time_slot in timestamps.all_timestamps:
-                        if not self.participant.is_available(time_slot):
-                            self.participant.toggle_availability(time_slot)
-                    print(f'{get_log_time()}> {self.event.name}> {self.participant.member.name} selected full availability')
+                    logger.info('%s deselected full availability', participant.member.name, extra={'event': event.name, 'participant': participant.member.name})
+            elif action == 'none':
+                participant.none_selected = not participant.none_selected
+                if participant.none_selected:
+                    participant.clear_availability()
+                    event.reason += f'{participant.member.name} has no availability. '
+                    # in quorum mode someone without availability just doesn't attend
+                    if not event.quorum:
+                        event.valid = False
+                    logger.info('%s selected no availability', participant.member.name, extra={'event': event.name, 'participant': participant.member.name})
                 else:
-                    button.style = ButtonStyle.blurple
-                    print(f'{get_log_time()}> {self.event.name}> {self.participant.member.name} deselected full availability')
-                try:
-                    await interaction.response.edit_message(view=self)
-                except Exception as e:
-                    print(f'{get_log_time()}> Error with ALL button press by {self.participant.member.name}: {e}')
-
-            button.callback = all_button_callback
-            self.add_item(button)
-
-        def add_none_button(self):
-            button = Button(label=self.none_label, style=ButtonStyle.blurple)
-            async def none_button_callback(interaction: Interaction):
-                self.event.changed = True
-                self.event.ready_to_create = False
-                self.participant.answered = True
-                await self.event.update_message()
-                if button.style == ButtonStyle.blurple:
-                    button.style = ButtonStyle.gray
-                    for time_slot in timestamps.all_timestamps:
-                        if self.participant.is_available(time_slot):
-                            self.participant.toggle_availability(time_slot)
-                    self.event.reason += f'{self.participant.member.name} has no availability. '
-                    self.event.valid = False
-                    print(f'{get_log_time()}> {self.event.name}> {self.participant.member.name} selected no availability')
+                    event.reason.replace(f'{participant.member.name} has no availability. ', '')
+                    event.valid = True
+                    logger.info('%s deselected no availability', participant.member.name, extra={'event': event.name, 'participant': participant.member.name})
+            elif action == 'unsub':
+                participant.subscribed = not participant.subscribed
+                if participant.subscribed:
+                    logger.info('%s resubscribed', participant.member.name, extra={'event': event.name, 'participant': participant.member.name})
                 else:
-                    button.style = ButtonStyle.blurple
-                    self.event.reason.replace(f'{self.participant.member.name} has no availability. ', '')
-                    self.event.valid = True
-                    print(f'{get_log_time()}> {self.event.name}> {self.participant.member.name} deselected no availability')
-                try:
-                    await interaction.response.edit_message(view=self)
-                except Exception as e:
-                    print(f'{get_log_time()}> Error with NONE button press by {self.participant.member.name}: {e}')
-
-            button.callback = none_button_callback
-            self.add_item(button)
-
-        def add_unsub_button(self):
-            button = Button(label=self.unsub_label, style=ButtonStyle.blurple)
-            async def unsub_button_callback(interaction: Interaction):
-                self.event.changed = True
-                self.event.ready_to_create = False
-                self.participant.answered = True
-                await self.event.update_message()
-                self.participant.subscribed = not self.participant.subscribed
-                if button.style == ButtonStyle.blurple:
-                    button.style = ButtonStyle.gray
-                    print(f'{get_log_time()}> {self.event.name}> {self.participant.member.name} unsubscribed')
+                    logger.info('%s unsubscribed', participant.member.name, extra={'event': event.name, 'participant': participant.member.name})
+            # elif action == 'weekly':
+            #     participant.weekly = not participant.weekly
+            #     logger.info('%s can attend weekly: %s', participant.member.name, participant.weekly, extra={'event': event.name, 'participant': participant.member.name})
+        try:
+            await interaction.response.edit_message(view=AvailabilityView(participant, event))
+        except Exception as e:
+            logger.error('Error responding to %s button press by %s: %s', action, participant.member.name, e, extra={'event': event.name, 'participant': participant.member.name, 'action': action})
+
+
+class EventButtons(View):
+    def __init__(self, event: Event):
+        super().__init__(timeout=None)
+        self.start_label = "Start Event"
+        self.end_label = "End Event"
+        self.reschedule_label = "Reschedule Event"
+        self.cancel_label = "Cancel Event"
+        self.event = event
+        closed = self.event.closed_by != ''
+        if self.event.started:
+            start_style = ButtonStyle.green
+        else:
+            start_style = ButtonStyle.blurple
+        if self.event.closed_by == 'end':
+            end_style = ButtonStyle.gray
+        else:
+            end_style = ButtonStyle.blurple
+        if self.event.closed_by == 'cancel':
+            cancel_style = ButtonStyle.gray
+        else:
+            cancel_style = ButtonStyle.red
+        self.add_item(Button(label=self.start_label, style=start_style, disabled=self.event.started or closed, custom_id=self.event.get_custom_id('start')))
+        self.add_item(Button(label=self.end_label, style=end_style, disabled=not self.event.started or closed, custom_id=self.event.get_custom_id('end')))
+        self.add_item(Button(label=self.reschedule_label, style=ButtonStyle.red, disabled=closed, custom_id=self.event.get_custom_id('reschedule')))
+        self.add_item(Button(label=self.cancel_label, style=cancel_style, disabled=closed, custom_id=self.event.get_custom_id('cancel')))
+        # presses are routed by custom_id in on_interaction, so keep discord.py from storing this view
+        self.stop()
+
+    @staticmethod
+    async def handle(interaction: Interaction, event: Event, action: str):
+        event.text_channel = interaction.channel
+        if action == 'start':
+            await EventButtons.start(interaction, event)
+        elif action == 'end':
+            await EventButtons.end(interaction, event)
+        elif action == 'reschedule':
+            await EventButtons.reschedule(interaction, event)
+        elif action == 'cancel':
+            await EventButtons.cancel(interaction, event)
+
+    @staticmethod
+    async def start(interaction: Interaction, event: Event):
+        if not event.created or event.scheduled_event.status != EventStatus.scheduled:
+            await interaction.response.edit_message(view=EventButtons(event))
+            return
+        logger.info('%s started by button press', interaction.user, extra={'event': event.name, 'participant': interaction.user.name, 'action': 'start'})
+        if not event.has_participant(interaction.user):
+            event.add_participant(Participant(interaction.user))
+        await event.scheduled_event.start(reason='Start button pressed.')
+        event.started = True
+        try:
+            await interaction.response.edit_message(view=EventButtons(event))
+        except Exception as e:
+            logger.error('Error responding to START button interaction: %s', e, extra={'event': event.name, 'action': 'start'})
+
+    @staticmethod
+    async def end(interaction: Interaction, event: Event):
+        if event.scheduled_event.status != EventStatus.active and event.scheduled_event.status != EventStatus.scheduled:
+            await interaction.response.edit_message(view=EventButtons(event))
+            return
+        logger.info('%s ended by button press', interaction.user, extra={'event': event.name, 'participant': interaction.user.name, 'action': 'end'})
+        client.discard_scheduled_event(event.scheduled_event)
+        await event.scheduled_event.delete(reason='End button pressed.')
+        event.created = False
+        event.closed_by = 'end'
+        await event.remove()
+        try:
+            await interaction.response.edit_message(view=EventButtons(event))
+        except Exception as e:
+            logger.error('Error responding to END button interaction: %s', e, extra={'event': event.name, 'action': 'end'})
+
+    @staticmethod
+    async def reschedule(interaction: Interaction, event: Event):
+        if not event.created:
+            await interaction.response.edit_message(view=EventButtons(event))
+            return
+        logger.info('%s rescheduled by button press', interaction.user, extra={'event': event.name, 'participant': interaction.user.name, 'action': 'reschedule'})
+        if not event.has_participant(interaction.user):
+            event.add_participant(Participant(interaction.user))
+        new_event = Event(event.name, event.entity_type, event.voice_channel, event.participants, event.guild, interaction.channel, event.image_url, event.duration) #, weekly
+        new_event.quorum = event.quorum
+        new_event.required_ids = event.required_ids
+        client.discard_scheduled_event(event.scheduled_event)
+        await event.scheduled_event.delete(reason='Reschedule button pressed.')
+        event.created = False
+        event.started = False
+        event.closed_by = 'reschedule'
+        await interaction.response.edit_message(view=EventButtons(event))
+        await event.remove()
+        client.add_event(new_event)
+        mentions = ''
+        for participant in event.participants:
+            if participant.member != interaction.user:
+                mentions += participant.member.mention
+        try:
+            await event.text_channel.send(f'{mentions}\n{interaction.user.mention} wants to reschedule {new_event.name}. Check your DMs to share your availability!')
+        except Exception as e:
+            logger.error('Error sending RESCHEDULE button text channel message: %s', e, extra={'event': event.name, 'action': 'reschedule'})
+        try:
+            await new_event.dm_all_participants(interaction, event.duration, reschedule=True)
+        except Exception as e:
+            logger.error('Error with RESCHEDULE button DMing all participants: %s', e, extra={'event': event.name, 'action': 'reschedule'})
+
+    @staticmethod
+    async def cancel(interaction: Interaction, event: Event):
+        # answer the interaction before any slow API calls or the DM fan-out
+        event.closed_by = 'cancel'
+        try:
+            await interaction.response.edit_message(view=EventButtons(event))
+        except Exception as e:
+            logger.error('Error sending CANCEL button interaction response: %s', e, extra={'event': event.name, 'action': 'cancel'})
+        if event.created:
+            client.discard_scheduled_event(event.scheduled_event)
+            await event.scheduled_event.delete(reason='Cancel button pressed.')
+            event.created = False
+        await event.remove()
+        logger.info('%s cancelled by button press', interaction.user, extra={'event': event.name, 'participant': interaction.user.name, 'action': 'cancel'})
+        others = [participant.member for participant in event.participants if participant.member != interaction.user]
+        mentions = ''.join(member.mention for member in others)
+        try:
+            await event.text_channel.send(f'{mentions}\n{interaction.user.mention} cancelled {event.name}.')
+        except Exception as e:
+            logger.error('Error sending cancelled message to text channel: %s', e, extra={'event': event.name, 'action': 'cancel'})
+        await client.dm_dispatcher.broadcast(others, f'{interaction.user.name} has cancelled {event.name}.')
+
+
+class SchedulerClient(AutoShardedClient):
+    FILENAME = 'info.json'
+
+    def __init__(self, intents, shard_count: int = None):
+        super(SchedulerClient, self).__init__(intents=intents, shard_count=shard_count)
+        self.tree = app_commands.CommandTree(self)
+        self.state_filename = self.FILENAME
+        self.events = []
+        # guild id -> {scheduled event id -> scheduled event}
+        self.scheduled_events = {}
+        # scheduled event id -> (monotonic fetch time, {user id -> user})
+        self.subscribers = {}
+        self.dm_dispatcher = DMDispatcher()
+        self.state_loaded = False
+        self.saved_state = None
+        self.image_cache = ImageCache()
+        self.deadlines = DeadlineScheduler()
+        # guild id -> (create queue, cancel queue, worker tasks)
+        self.guild_workers = {}
+        # guild id -> {('location', voice channel id or external location) or ('member', member id) -> IntervalIndex of scheduled times}
+        self.busy_intervals = {}
+        # event id -> event, for routing button presses
+        self.events_by_id = {}
+        # scheduled event id -> event
+        self.events_by_scheduled_event_id = {}
+        # guild id -> {normalized event name -> events with that name}
+        self.guild_event_names = {}
+        # worker processes for joint solves, started on first use
+        self.solver_pool = None
+        self.jobs = JobQueue()
+
+    def add_event(self, event):
+        self.events.append(event)
+        self.events_by_id[event.id] = event
+        event.tracked = True
+        self.index_scheduled_event(event)
+        self.index_event_name(event)
+        self.index_busy(event)
+        event.schedule_deadlines()
+
+    def remove_event(self, event):
+        self.events.remove(event)
+        self.events_by_id.pop(event.id, None)
+        if event.scheduled_event and self.events_by_scheduled_event_id.get(event.scheduled_event.id) is event:
+            del self.events_by_scheduled_event_id[event.scheduled_event.id]
+        self.unindex_event_name(event)
+        self.unindex_busy(event)
+        event.tracked = False
+
+    @staticmethod
+    def get_busy_keys(event):
+        if isinstance(event.voice_channel, str) or event.voice_channel is None:
+            location = event.voice_channel
+        else:
+            location = event.voice_channel.id
+        return [('location', location)] + [('member', member_id) for member_id in event.member_ids]
+
+    def index_busy(self, event):
+        self.unindex_busy(event)
+        if event.start_time is None:
+            return
+        end_time = event.end_time or event.start_time + timedelta(minutes=event.duration)
+        guild_intervals = self.busy_intervals.setdefault(event.guild.id, {})
+        keys = self.get_busy_keys(event)
+        for key in keys:
+            guild_intervals.setdefault(key, IntervalIndex()).add(event.start_time, end_time, event)
+        event.busy_interval = (event.start_time, end_time, keys)
+
+    def index_busy_member(self, event, member_id):
+        if event.busy_interval is None:
+            return
+        start, end, keys = event.busy_interval
+        keys.append(('member', member_id))
+        self.busy_intervals.setdefault(event.guild.id, {}).setdefault(('member', member_id), IntervalIndex()).add(start, end, event)
+
+    def unindex_busy(self, event):
+        if event.busy_interval is None:
+            return
+        start, end, keys = event.busy_interval
+        guild_intervals = self.busy_intervals.get(event.guild.id, {})
+        for key in keys:
+            intervals = guild_intervals.get(key)
+            if intervals is None:
+                continue
+            intervals.remove(start, event)
+            if not intervals:
+                del guild_intervals[key]
+        event.busy_interval = None
+
+    def get_conflicting_intervals(self, event, start: datetime, end: datetime):
+        # (start, end, event) of every other event overlapping [start, end) in the same location or with a shared participant
+        guild_intervals = self.busy_intervals.get(event.guild.id, {})
+        conflicts = {}
+        for key in self.get_busy_keys(event):
+            intervals = guild_intervals.get(key)
+            if intervals is None:
+                continue
+            for interval in intervals.overlapping(start, end):
+                if interval[2] is not event:
+                    conflicts[interval[2]] = interval
+        return conflicts.values()
+
+    def upsert_scheduled_event(self, scheduled_event: ScheduledEvent):
+        self.scheduled_events.setdefault(scheduled_event.guild_id, {})[scheduled_event.id] = scheduled_event
+
+    def discard_scheduled_event(self, scheduled_event: ScheduledEvent):
+        guild_scheduled_events = self.scheduled_events.get(scheduled_event.guild_id)
+        if guild_scheduled_events is not None:
+            guild_scheduled_events.pop(scheduled_event.id, None)
+        self.subscribers.pop(scheduled_event.id, None)
+
+    def iter_scheduled_events(self):
+        for guild_scheduled_events in self.scheduled_events.values():
+            yield from guild_scheduled_events.values()
+
+    def refresh_upcoming_scheduled_events(self):
+        cutoff = datetime.now().astimezone() + timedelta(hours=13)
+        for guild in self.guilds:
+            for scheduled_event in guild.scheduled_events:
+                if scheduled_event.start_time < cutoff:
+                    self.upsert_scheduled_event(scheduled_event)
+
+    async def get_subscribers(self, scheduled_event: ScheduledEvent):
+        # Gateway user add/remove events keep the cache current, the TTL only covers missed events
+        cached = self.subscribers.get(scheduled_event.id)
+        if cached and time.monotonic() - cached[0] < SUBSCRIBER_CACHE_TTL:
+            return list(cached[1].values())
+        users = {}
+        async for user in scheduled_event.users():
+            users[user.id] = user
+        self.subscribers[scheduled_event.id] = (time.monotonic(), users)
+        return list(users.values())
+
+    def add_subscriber(self, scheduled_event: ScheduledEvent, user):
+        cached = self.subscribers.get(scheduled_event.id)
+        if cached:
+            cached[1][user.id] = user
+
+    def remove_subscriber(self, scheduled_event: ScheduledEvent, user):
+        cached = self.subscribers.get(scheduled_event.id)
+        if cached:
+            cached[1].pop(user.id, None)
+
+    def get_event_by_id(self, event_id: str):
+        return self.events_by_id.get(event_id)
+
+    async def dispatch_component(self, interaction: Interaction):
+        # Button custom_ids look like scheduler:<event id>:<action>[:<arg>]
+        prefix, event_id, action, *args = interaction.data['custom_id'].split(':', 3) + ['']
+        event = self.get_event_by_id(event_id)
+        if event is None:
+            await interaction.response.send_message('This event no longer exists.', ephemeral=True)
+            return
+        if action in ('start', 'end', 'reschedule', 'cancel'):
+            await EventButtons.handle(interaction, event, action)
+        else:
+            await AvailabilityView.handle(interaction, event, action, args[0])
+
+    def get_event_by_scheduled_event(self, scheduled_event: ScheduledEvent):
+        event = self.events_by_scheduled_event_id.get(scheduled_event.id)
+        if event and event.created:
+            return event
+        return None
+
+    def index_scheduled_event(self, event):
+        if event.tracked and event.scheduled_event:
+            self.events_by_scheduled_event_id[event.scheduled_event.id] = event
+
+    def find_event(self, name: str, guild: Guild = None):
+        # search every guild's events when the command didn't come from a guild (e.g. DMs)
+        name = normalize_event_name(name)
+        if guild:
+            guild_names = [self.guild_event_names.get(guild.id, {})]
+        else:
+            guild_names = self.guild_event_names.values()
+        for names in guild_names:
+            if name in names:
+                return names[name][0]
+        return None
+
+    def get_event_names(self, guild: Guild = None, current: str = ''):
+        current = normalize_event_name(current)
+        if guild:
+            guild_names = [self.guild_event_names.get(guild.id, {})]
+        else:
+            guild_names = self.guild_event_names.values()
+        return [events[0].name for names in guild_names for name, events in names.items() if current in name]
+
+    def index_event_name(self, event):
+        self.guild_event_names.setdefault(event.guild.id, {}).setdefault(normalize_event_name(event.name), []).append(event)
+
+    def unindex_event_name(self, event):
+        names = self.guild_event_names.get(event.guild.id, {})
+        name = normalize_event_name(event.name)
+        if event in names.get(name, []):
+            names[name].remove(event)
+            if not names[name]:
+                del names[name]
+
+    def rename_event(self, event, name: str):
+        if event.name == name:
+            return
+        if event.tracked:
+            self.unindex_event_name(event)
+        event.name = name
+        if event.tracked:
+            self.index_event_name(event)
+
+    def apply_scheduled_event(self, event, scheduled_event: ScheduledEvent):
+        event.scheduled_event = scheduled_event
+        self.index_scheduled_event(event)
+        self.rename_event(event, scheduled_event.name)
+        event.created = True
+        event.start_time = scheduled_event.start_time.replace(second=0, microsecond=0)
+        event.end_time = scheduled_event.end_time
+        if scheduled_event.entity_type == EntityType.external:
+            event.voice_channel = scheduled_event.location
+        else:
+            event.voice_channel = self.get_channel(scheduled_event.channel_id)
+        if event.tracked:
+            self.index_busy(event)
+            event.schedule_warning()
+
+    @metrics.timed('scheduler_operation_seconds', operation='parse_scheduled_events')
+    async def parse_scheduled_events(self):
+        # track events that we find an existing scheduled event for
+        touched_events = {}
+        for event in self.events:
+            touched_events[event] = False
+        for scheduled_event in list(self.iter_scheduled_events()):
+            if scheduled_event.status == EventStatus.scheduled or scheduled_event.status == EventStatus.active:
+                found = False
+                event = self.get_event_by_scheduled_event(scheduled_event)
+                if event:
+                    found = True
+                    touched_events[event] = True
+                    self.apply_scheduled_event(event, scheduled_event)
+                    try:
+                        event.sync_participants(await self.get_subscribers(scheduled_event))
+                    except Exception as e:
+                        logger.error('Error getting users from scheduled event: %s', e, extra={'event': event.name})
+                # create event in memory to match existing scheduled event
+                if not found:
+                    try:
+                        participants = [Participant(user) for user in await self.get_subscribers(scheduled_event)]
+                    except Exception as e:
+                        logger.error('Error looping through participants: %s', e, extra={'event': scheduled_event.name})
+                        logger.info('Removing scheduled event from list', extra={'event': scheduled_event.name})
+                        self.discard_scheduled_event(scheduled_event)
+                        continue
+                    if scheduled_event.end_time:
+                        time_difference = scheduled_event.end_time.replace(second=0, microsecond=0) - scheduled_event.start_time.replace(second=0, microsecond=0)
+                        duration = int(time_difference.total_seconds() / 60)
+                    else:
+                        duration = 30
+                    if scheduled_event.entity_type == EntityType.external:
+                        location = scheduled_event.location
+                    else:
+                        location = client.get_channel(scheduled_event.channel_id)
+                    event = Event(scheduled_event.name, scheduled_event.entity_type, location, participants, scheduled_event.guild, None, None, duration)
+                    event.created = True
+                    event.start_time = scheduled_event.start_time.replace(second=0, microsecond=0)
+                    event.end_time = event.start_time.replace(second=0, microsecond=0) + timedelta(minutes=duration)
+                    event.voice_channel = location
+                    event.scheduled_event = scheduled_event
+                    self.add_event(event)
+                    logger.info('Found event and added to memory with participants: %s', [participant.member.name for participant in event.participants], extra={'event': event.name})
+        # if a memory event is marked as created but doesn't have a scheduled event, delete it
+        for event in touched_events:
+            if not touched_events[event] and event.created and not event.scheduled_event:
+                self.remove_event(event)
+                logger.info('Did not find event and removed from memory', extra={'event': event.name})
+
+    @metrics.timed('scheduler_operation_seconds', operation='make_scheduled_event')
+    async def make_scheduled_event(self, event):
+        event.scheduled_event = await event.guild.create_scheduled_event(name=event.name, description='Bot-generated event', start_time=event.start_time, end_time=event.end_time, entity_type=event.entity_type, channel=event.voice_channel, privacy_level=event.privacy_level)
+        # register the scheduled event before awaiting anything else so a concurrent parse_scheduled_events doesn't adopt it as a new event
+        self.upsert_scheduled_event(event.scheduled_event)
+        self.index_scheduled_event(event)
+        event.ready_to_create = False
+        event.created = True
+        if event.tracked:
+            event.schedule_warning()
+        if event.image_url:
+            try:
+                image = await self.image_cache.get(event.image_url)
+                if image:
+                    await event.scheduled_event.edit(image=image)
+                    logger.info('Processed image', extra={'event': event.name})
                 else:
-                    button.style = ButtonStyle.blurple
-                    print(f'{get_log_time()}> {self.event.name}> {self.participant.member.name} resubscribed')
-                try:
-                    await interaction.response.edit_message(view=self)
-                except Exception as e:
-                    print(f'{get_log_time()}> Error with UNSUB button press by {self.participant.member.name}: {e}')
-
-            button.callback = unsub_button_callback
-            self.add_item(button)
-
-        # def add_weekly_button(self):
-        #     button = Button(label=self.weekly_label, style=ButtonStyle.gray)
-        #     async def weekly_button_callback(interaction: Interaction):
-        #         self.event.changed = True
-        #         self.event.ready_to_create = False
-        #         if button.style == ButtonStyle.gray:
-        #             button.style = ButtonStyle.green
-        #             self.participant.weekly = True
-        #             print(f'{get_log_time()}> {self.event.name}> {self.participant.member.name} can attend weekly')
-        #         else:
-        #             button.style = ButtonStyle.gray
-        #             self.participant.weekly = False
-        #             print(f'{get_log_time()}> {self.event.name}> {self.participant.member.name} cannot attend weekly')
-
-        #     button.callback = weekly_button_callback
-        #     self.add_item(button)
-
-    class EventButtons(View):
-        def __init__(self, event: Event):
-            super().__init__(timeout=None)
-            self.start_label = "Start Event"
-            self.end_label = "End Event"
-            self.reschedule_label = "Reschedule Event"
-            self.cancel_label = "Cancel Event"
-            self.event = event
-            self.start_button = Button(label=self.start_label, style=ButtonStyle.blurple)
-            self.end_button = Button(label=self.end_label, style=ButtonStyle.blurple)
-            self.reschedule_button = Button(label=self.reschedule_label, style=ButtonStyle.red)
-            self.cancel_button = Button(label=self.cancel_label, style=ButtonStyle.red)
-            self.add_start_button()
-            self.add_end_button()
-            self.add_reschedule_button()
-            self.add_cancel_button()
-
-        def add_start_button(self):
-            async def start_button_callback(interaction: Interaction):
-                self.event.text_channel = interaction.channel
-                if not self.event.created or self.event.scheduled_event.status != EventStatus.scheduled:
-                    await interaction.response.edit_message(view=self)
-                    return
-                print(f'{get_log_time()}> {self.event.name}> {interaction.user} started by button press')
-                participant_names = [participant.member.name for participant in self.event.participants]
-                if interaction.user.name not in participant_names:
-                    self.event.participants.append(interaction.user)
-                await self.event.scheduled_event.start(reason='Start button pressed.')
-                self.event.started = True
-                self.start_button.style = ButtonStyle.green
-                self.start_button.disabled = True
-                self.end_button.disabled = False
-                try:
-                    await interaction.response.edit_message(view=self)
-                except Exception as e:
-                    print(f'{get_log_time()}> Error responding to START button interaction: {e}')
-            self.start_button.callback = start_button_callback
-            self.add_item(self.start_button)
-
-        def add_end_button(self):
-            self.end_button.disabled = True
-            async def end_button_callback(interaction: Interaction):
-                self.event.text_channel = interaction.channel
-                if self.event.scheduled_event.status != EventStatus.active and self.event.scheduled_event.status != EventStatus.scheduled:
-                    await interaction.response.edit_message(view=self)
-                    return
-                print(f'{get_log_time()}> {self.event.name}> {interaction.user} ended by button press')
-                client.scheduled_events.remove(self.event.scheduled_event)
-                await self.event.scheduled_event.delete(reason='End button pressed.')
-                self.event.created = False
-                await self.event.remove()
-                self.end_button.style = ButtonStyle.gray
-                self.end_button.disabled = True
-                self.reschedule_button.disabled = True
-                self.cancel_button.disabled = True
-                try:
-                    await interaction.response.edit_message(view=self)
-                except Exception as e:
-                    print(f'{get_log_time()}> Error responding to END button interaction: {e}')
-            self.end_button.callback = end_button_callback
-            self.add_item(self.end_button)
-
-        def add_reschedule_button(self):
-            async def reschedule_button_callback(interaction: Interaction):
-                self.event.text_channel = interaction.channel
-                if not self.event.created:
-                    await interaction.response.edit_message(view=self)
-                    return
-                print(f'{get_log_time()}> {self.event.name}> {interaction.user} rescheduled by button press')
-                participant_names = [participant.member.name for participant in self.event.participants]
-                if interaction.user.name not in participant_names:
-                    self.event.participants.append(interaction.user)
-                new_event = Event(self.event.name, self.event.entity_type, self.event.voice_channel, self.event.participants, self.event.guild, interaction.channel, self.event.image_url, self.event.duration) #, weekly
-                client.scheduled_events.remove(self.event.scheduled_event)
-                await self.event.scheduled_event.delete(reason='Reschedule button pressed.')
-                self.event.created = False
-                self.start_button.disabled = True
-                self.start_button.style = ButtonStyle.blurple
-                self.end_button.disabled = True
-                self.end_button.style = ButtonStyle.blurple
-                self.reschedule_button.disabled = True
-                self.cancel_button.disabled = True
-                await interaction.response.edit_message(view=self)
-                await self.event.remove()
-                client.events.append(new_event)
-                mentions = ''
-                for participant in self.event.participants:
-                    if participant.member != interaction.user:
-                        mentions += participant.member.mention
+                    event.image_url = ''
+                    logger.warning('Failed to get image', extra={'event': event.name})
+            except Exception as e:
+                event.image_url = ''
+                logger.warning('Failed to process image: %s', e, extra={'event': event.name})
+        logger.info('Created event starting at %s:%s and ending at %s:%s', event.start_time.hour, event.start_time.minute, event.end_time.hour, event.end_time.minute, extra={'event': event.name})
+        return event.scheduled_event
+
+    async def save_state(self):
+        state = json.dumps({'events': [event.to_dict() for event in self.events]}, indent=4)
+        if state == self.saved_state:
+            return
+        await to_thread(self.write_state, state)
+        self.saved_state = state
+
+    def write_state(self, state: str):
+        # write to a temporary file and swap it in so a crash mid-write can't corrupt the saved state
+        temp_filename = self.state_filename + '.tmp'
+        with open(temp_filename, 'w', encoding='utf-8') as file:
+            file.write(state)
+        os.replace(temp_filename, self.state_filename)
+
+    def load_state(self):
+        if self.state_loaded:
+            return
+        self.state_loaded = True
+        if not os.path.exists(self.state_filename):
+            return
+        try:
+            with open(self.state_filename, 'r', encoding='utf-8') as file:
+                state = json.load(file)
+        except Exception as e:
+            logger.error('Error reading %s: %s', self.state_filename, e)
+            return
+        for event_data in state.get('events', []):
+            try:
+                event = Event.from_dict(event_data)
+            except Exception as e:
+                logger.error('Error restoring event: %s', e, extra={'event': event_data.get('name')})
+                continue
+            if event is None:
+                logger.info('Guild, scheduled event or channel no longer exists, not restoring event', extra={'event': event_data.get('name')})
+                continue
+            # a poll whose window has passed has expired, and one saved without its day can't place its availability
+            if not event.created and (event.day is None or slot_calendar.get_last_time(event.day) <= datetime.now().astimezone()):
+                logger.info('Poll window has passed, not restoring event', extra={'event': event.name})
+                continue
+            self.add_event(event)
+            if event.scheduled_event:
+                self.upsert_scheduled_event(event.scheduled_event)
+                # the saved participants are the subscribers, so a warm restart doesn't page through users() again
+                self.subscribers[event.scheduled_event.id] = (time.monotonic(), {participant.member.id: participant.member for participant in event.participants})
+            logger.info('Restored event from %s', self.state_filename, extra={'event': event.name})
+
+    def get_guild_workers(self, guild_id: int):
+        # each guild gets its own create and cancel queues and workers so one guild's backlog can't stall another
+        if guild_id not in self.guild_workers:
+            create_queue = Queue()
+            cancel_queue = Queue()
+            self.guild_workers[guild_id] = (create_queue, cancel_queue, [create_task(self.create_events_worker(create_queue)), create_task(self.cancel_events_worker(cancel_queue))])
+        return self.guild_workers[guild_id]
+
+    async def solve_events(self):
+        # (guild id, scheduling day) -> events ready to solve, a joint solve shares one slot grid
+        ready_events = {}
+        for event in self.events.copy():
+            if event.created or event.ready_to_create:
+                continue
+            if event.valid:
+                if event.changed or not event.is_ready_to_solve():
+                    event.changed = False
+                    continue
+                ready_events.setdefault((event.guild.id, event.day), []).append(event)
+            else:
+                self.queue_solved_event(event)
+        for events in ready_events.values():
+            if len(events) >= JOINT_SOLVE_MIN_EVENTS:
                 try:
-                    await self.event.text_channel.send(f'{mentions}\n{interaction.user.mention} wants to reschedule {new_event.name}. Check your DMs to share your availability!')
+                    await self.solve_jointly(events)
                 except Exception as e:
-                    print(f'{get_log_time()}> Error sending RESCHEDULE button text channel message: {e}')
+                    logger.error('Error solving events jointly, solving them one at a time: %s', e, extra={'guild': events[0].guild.name})
+            for event in events:
                 try:
-                    await new_event.dm_all_participants(interaction, self.event.duration, reschedule=True)
+                    # events placed by the joint solve are already ready, the rest are solved on their own
+                    if not event.tracked or event.changed:
+                        continue
+                    if not event.ready_to_create and event.valid:
+                        event.check_times(event.has_everyone_answered())
+                    self.queue_solved_event(event)
                 except Exception as e:
-                    print(f'{get_log_time()}> Error with RESCHEDULE button DMing all participants: {e}')
-            self.reschedule_button.callback = reschedule_button_callback
-            self.add_item(self.reschedule_button)
-
-        def add_cancel_button(self):
-            async def cancel_button_callback(interaction: Interaction):
-                self.event.text_channel = interaction.channel
-                if self.event.created:
-                    client.scheduled_events.remove(self.event.scheduled_event)
-                    await self.event.scheduled_event.delete(reason='Cancel button pressed.')
-                    self.event.created = False
-                await self.event.remove()
+                    logger.error('Error comparing availabilities: %s', e, extra={'event': event.name})
+
+    def queue_solved_event(self, event):
+        if not event.valid:
+            event.ready_to_create = False
+            self.get_guild_workers(event.guild.id)[1].put_nowait(event)
+        elif event.ready_to_create:
+            self.get_guild_workers(event.guild.id)[0].put_nowait(event)
+
+    def get_solver_pool(self):
+        if self.solver_pool is None:
+            self.solver_pool = ProcessPoolExecutor(max_workers=SOLVER_PROCESSES)
+        return self.solver_pool
+
+    @metrics.timed('scheduler_operation_seconds', operation='solve_jointly')
+    async def solve_jointly(self, events: list):
+        # Place every ready event of a guild at once so an event solved first can't take the only slot another one had
+        now = datetime.now().astimezone()
+        slot_times = slot_calendar.get_times(events[0].day)
+        # the batch is placed from scratch, so drop slots these events took in earlier solves
+        for event in events:
+            self.unindex_busy(event)
+        problems = [(event.get_preferred_slots(now, slot_times), event.duration, self.get_busy_keys(event)) for event in events]
+        slot_offsets = [(slot_time - slot_times[0]).total_seconds() / 60 for slot_time in slot_times]
+        assignment = await get_running_loop().run_in_executor(self.get_solver_pool(), assign_slots, problems, slot_offsets)
+        for event, index in zip(events, assignment):
+            # a button press during the solve means the answers it used are stale
+            if not event.tracked or event.changed:
+                continue
+            if index is None:
+                # an early quorum solve keeps waiting for more answers rather than cancelling
+                if event.has_everyone_answered():
+                    event.invalidate()
+                continue
+            if event.quorum:
+                # chosen slot first, then the best alternatives
+                event.candidates = sorted(event.candidates, key=lambda candidate: candidate[0] != index)[:QUORUM_CANDIDATES]
+            event.set_start_slot(slot_times, index)
+        logger.info('Jointly placed %s of %s events', sum(index is not None for index in assignment), len(events), extra={'guild': events[0].guild.name})
+
+    async def cancel_events_worker(self, cancel_queue: Queue):
+        while True:
+            event = await cancel_queue.get()
+            metrics.inc('scheduler_queue_items_total', queue='cancel')
+            if not event.tracked:
+                continue
+            try:
+                await event.remove()
+                logger.info('Event invalid, removed event from memory', extra={'event': event.name})
+                await event.text_channel.send(f'No shared availability has been found. Scheduling for {event.name} has been cancelled.\n' + event.reason)
+                await self.dm_dispatcher.broadcast([participant.member for participant in event.participants], f'Scheduling for {event.name} has been cancelled.')
+            except Exception as e:
+                logger.error('Error invalidating and deleting event: %s', e, extra={'event': event.name})
+
+    async def create_events_worker(self, create_queue: Queue):
+        while True:
+            event = await create_queue.get()
+            metrics.inc('scheduler_queue_items_total', queue='create')
+            # a button press since solving clears ready_to_create, the solve stage will pick the event up again
+            if not event.tracked or not event.ready_to_create:
+                continue
+            try:
+                event.scheduled_event = await self.make_scheduled_event(event)
+            except Exception as e:
+                event.ready_to_create = False
+                logger.error('Error creating scheduled event: %s', e, extra={'event': event.name})
+                continue
+            try:
                 mentions = ''
-                for participant in self.event.participants:
-                    if participant.member != interaction.user:
-                        async with client.msg_lock:
-                            await participant.member.send(f'{interaction.user.name} has cancelled {self.event.name}.')
-                        mentions += participant.member.mention
-                print(f'{get_log_time()}> {self.event.name}> {interaction.user} cancelled by button press')
-                self.cancel_button.style = ButtonStyle.gray
-                self.start_button.disabled = True
-                self.end_button.disabled = True
-                self.reschedule_button.disabled = True
-                self.cancel_button.disabled = True
-                try:
-                    await interaction.response.edit_message(view=self)
-                    await self.event.text_channel.send(f'{mentions}\n{interaction.user.mention} cancelled {self.event.name}.')
-                except Exception as e:
-                    print(f'{get_log_time()}> Error sending CANCEL button interaction response or cancelled message to text channel: {e}')
-            self.cancel_button.callback = cancel_button_callback
-            self.add_item(self.cancel_button)
-
-    class SchedulerClient(Client):
-        FILENAME = 'info.json'
-
-        def __init__(self, intents):
-            super(SchedulerClient, self).__init__(intents=intents)
-            self.tree = app_commands.CommandTree(self)
-            self.events = []
-            self.scheduled_events = []
-            self.guild_scheduled_events = {}
-            self.msg_lock = Lock()
-
-        async def parse_scheduled_events(self):
-            # track events that we find an existing scheduled event for
-            touched_events = {}
-            for event in self.events:
-                touched_events[event] = False
-            for scheduled_event in self.scheduled_events.copy():
-                if scheduled_event.status == EventStatus.scheduled or scheduled_event.status == EventStatus.active:
-                    found = False
-                    for event in self.events:
-                        if not event.created:
-                            continue
-                        if scheduled_event.id == event.scheduled_event.id:
-                            found = True
-                            touched_events[event] = True
-                            event.name = scheduled_event.name
-                            event.created = True
-                            event.start_time = scheduled_event.start_time.replace(second=0, microsecond=0)
-                            event.end_time = scheduled_event.end_time
-                            if scheduled_event.entity_type == EntityType.external:
-                                location = scheduled_event.location
-                            else:
-                                location = client.get_channel(scheduled_event.channel_id)
-                            event.voice_channel = location
-                            participants = []
-                            try:
-                               async for user in scheduled_event.users():
-                                    participants.append(Participant(user))
-                            except Exception as e:
-                                print(f'{get_log_time()}> Error getting users from scheduled event: {e}')
-                            event.participants = participants
-                            break
-                    # create event in memory to match existing scheduled event
-                    if not found:
-                        participants = []
-                        try:
-                            async for user in scheduled_event.users():
-                                participants.append(Participant(user))
-                        except Exception as e:
-                            print(f'{get_log_time()}> {scheduled_event.name}> Error looping through participants: {e}')
-                            print(f'{get_log_time()}> {scheduled_event.name}> Removing scheduled event from list')
-                            self.scheduled_events.remove(scheduled_event)
-                            continue
-                        if scheduled_event.end_time:
-                            time_difference = scheduled_event.end_time.replace(second=0, microsecond=0) - scheduled_event.start_time.replace(second=0, microsecond=0)
-                            duration = int(time_difference.total_seconds() / 60)
-                        else:
-                            duration = 30
-                        if scheduled_event.entity_type == EntityType.external:
-                            location = scheduled_event.location
-                        else:
-                            location = client.get_channel(scheduled_event.channel_id)
-                        event = Event(scheduled_event.name, scheduled_event.entity_type, location, participants, scheduled_event.guild, None, None, duration)
-                        event.created = True
-                        event.start_time = scheduled_event.start_time.replace(second=0, microsecond=0)
-                        event.end_time = event.start_time.replace(second=0, microsecond=0) + timedelta(minutes=duration)
-                        event.voice_channel = location
-                        event.scheduled_event = scheduled_event
-                        self.events.append(event)
-                        print(f'{get_log_time()}> {event.name}> Found event and added to memory')
-                        print(f'{get_log_time()}> {event.name}> participants:')
-                        for participant in event.participants:
-                            print(f'{get_log_time()}> {event.name}> \t{participant.member.name}')
-            # if a memory event is marked as created but doesn't have a scheduled event, delete it
-            for event in touched_events:
-                if not touched_events[event] and event.created and not event.scheduled_event:
-                    self.events.remove(event)
-                    print(f'{get_log_time()}> {event.name}> Did not find event and removed from memory')
-
-        async def make_scheduled_event(self, event):
-            event.scheduled_event = await event.guild.create_scheduled_event(name=event.name, description='Bot-generated event', start_time=event.start_time, end_time=event.end_time, entity_type=event.entity_type, channel=event.voice_channel, privacy_level=event.privacy_level)
-            if event.image_url:
-                try:
-                    response = requests.get(event.image_url)
-                    if response.status_code == 200:
-                        await event.scheduled_event.edit(image=response.content)
-                        print(f'{get_log_time()}> {event.name}> Processed image')
+                unsubbed = ''
+                for participant in event.participants:
+                    if participant.subscribed:
+                        mentions += f'{participant.member.mention} '
                     else:
-                        event.image_url = ''
-                        print(f'{get_log_time()}> {event.name}> Failed to get image')
-                except Exception as e:
-                    event.image_url = ''
-                    print(f'{get_log_time()}> {event.name}> Failed to process image: {e}')
-            client.scheduled_events.append(event.scheduled_event)
-            event.ready_to_create = False
-            event.created = True
-            print(f'{get_log_time()}> {event.name}> Created event starting at {event.start_time.hour}:{event.start_time.minute} and ending at {event.end_time.hour}:{event.end_time.minute}')
-            return event.scheduled_event
-
-        async def setup_hook(self):
-            await self.tree.sync()
+                        unsubbed += f'{participant.member.name} '
+                if unsubbed != '':
+                    unsubbed = '\nUnsubscribed: ' + unsubbed
+                if event.quorum and event.candidates:
+                    subscribed_count = sum(participant.subscribed for participant in event.participants)
+                    unsubbed += f'\n{event.candidates[0][1]} of {subscribed_count} subscribed participants are available.'
+                    alternatives = ', '.join(f'{slot_calendar.labels[index]} ({attendance})' for index, attendance in event.candidates[1:])
+                    if alternatives:
+                        unsubbed += f' Next best times: {alternatives}'
+            except Exception as e:
+                logger.error('Error generating mentions/unsubbed strings: %s', e, extra={'event': event.name})
+            try:
+                if event.quorum:
+                    heads_up = 'Enough of you are available for'
+                else:
+                    heads_up = 'You are all available for'
+                response = ''
+                if event.start_time.hour < 10 and event.start_time.minute < 10:
+                    response = f'{mentions}\nHeads up! {heads_up} {event.name} starting today at 0{event.start_time.hour}:0{event.start_time.minute} ET.\n' + unsubbed
+                elif event.start_time.hour >= 10 and event.start_time.minute < 10:
+                    response = f'{mentions}\nHeads up! {heads_up} {event.name} starting today at {event.start_time.hour}:0{event.start_time.minute} ET.\n' + unsubbed
+                elif event.start_time.hour < 10 and event.start_time.minute >= 10:
+                    response = f'{mentions}\nHeads up! {heads_up} {event.name} starting today at 0{event.start_time.hour}:{event.start_time.minute} ET.\n' + unsubbed
+                else:
+                    response = f'{mentions}\nHeads up! {heads_up} {event.name} starting today at {event.start_time.hour}:{event.start_time.minute} ET.\n' + unsubbed
+                await event.text_channel.send(content=response, view=EventButtons(event))
+            except Exception as e:
+                logger.error('Error sending event created notification with buttons: %s', e, extra={'event': event.name})
+
+    def count_api_requests(self):
+        request = self.http.request
+        async def counted_request(route, **kwargs):
+            metrics.inc('scheduler_api_requests_total', method=route.method)
+            return await request(route, **kwargs)
+        self.http.request = counted_request
+
+    async def setup_hook(self):
+        self.count_api_requests()
+        self.jobs.start()
+        metrics.gauge('scheduler_events', lambda: len(self.events))
+        metrics.gauge('scheduler_participants', lambda: sum(len(event.participants) for event in self.events))
+        logging.getLogger('discord.http').addHandler(RateLimitCounter())
+        if METRICS_PORT:
+            await metrics.serve(int(METRICS_PORT))
+        await self.tree.sync()
+
+    async def close(self):
+        try:
+            await self.save_state()
+        except Exception as e:
+            logger.error('Error saving state to %s: %s', self.state_filename, e)
+        await self.image_cache.close()
+        if self.solver_pool is not None:
+            self.solver_pool.shutdown(wait=False, cancel_futures=True)
+        await super().close()
 
 
+def main():
+    global client
     discord_token = os.getenv('DISCORD_TOKEN')
-    client = SchedulerClient(intents=Intents.all())
+    # one process runs every shard: Discord only delivers DMs and DM button presses to shard 0,
+    # so a process owning a subset of shards would never see the availability buttons of its own events
+    if os.getenv('SHARD_IDS'):
+        sys.exit('SHARD_IDS is not supported, DM interactions only reach shard 0 so one process must run every shard. Set only SHARD_COUNT.')
+    shard_count = os.getenv('SHARD_COUNT')
+    if shard_count and (not shard_count.isdigit() or int(shard_count) < 1):
+        sys.exit(f'SHARD_COUNT must be a positive integer, got {shard_count!r}.')
+    client = SchedulerClient(intents=Intents.all(), shard_count=int(shard_count) if shard_count else None)
 
     @client.event
     async def on_ready():
-        print(f'{get_log_time()}> {client.user} has connected to Discord!')
-        if not create_guild_event.is_running():
-            create_guild_event.start()
+        logger.info('%s has connected to Discord!', client.user)
+        client.load_state()
+        client.deadlines.start()
+        loops = [reconcile_scheduled_events, solve_events, save_state]
+        if not METRICS_PORT:
+            loops.append(dump_metrics)
+        for loop in loops:
+            if not loop.is_running():
+                loop.start()
+
+    @client.event
+    async def on_interaction(interaction: Interaction):
+        if interaction.type != InteractionType.component or not interaction.data.get('custom_id', '').startswith(CUSTOM_ID_PREFIX + ':'):
+            return
+        try:
+            await client.dispatch_component(interaction)
+        except Exception as e:
+            logger.error('Error handling button press %s by %s: %s', interaction.data['custom_id'], interaction.user.name, e, extra={'participant': interaction.user.name})
+        metrics.observe('scheduler_interaction_latency_seconds', (datetime.now().astimezone() - interaction.created_at).total_seconds())
+
+    @client.event
+    async def on_scheduled_event_create(scheduled_event: ScheduledEvent):
+        client.upsert_scheduled_event(scheduled_event)
+        logger.info('New guild scheduled_event, added to local scheduled_events', extra={'event': scheduled_event.name})
+
+    @client.event
+    async def on_scheduled_event_update(before: ScheduledEvent, after: ScheduledEvent):
+        if after.status != EventStatus.scheduled and after.status != EventStatus.active:
+            client.discard_scheduled_event(after)
+            return
+        client.upsert_scheduled_event(after)
+        event = client.get_event_by_scheduled_event(after)
+        if event:
+            client.apply_scheduled_event(event, after)
+            logger.info('Updated from guild scheduled_event', extra={'event': event.name})
+
+    @client.event
+    async def on_scheduled_event_delete(scheduled_event: ScheduledEvent):
+        client.discard_scheduled_event(scheduled_event)
+        logger.info('Guild scheduled_event is gone, removed from local scheduled_events', extra={'event': scheduled_event.name})
+
+    @client.event
+    async def on_scheduled_event_user_add(scheduled_event: ScheduledEvent, user):
+        client.add_subscriber(scheduled_event, user)
+        event = client.get_event_by_scheduled_event(scheduled_event)
+        if event and not event.has_participant(user):
+            event.add_participant(Participant(user))
+            logger.info('Added %s as a participant', user.name, extra={'event': scheduled_event.name, 'participant': user.name})
+
+    @client.event
+    async def on_scheduled_event_user_remove(scheduled_event: ScheduledEvent, user):
+        client.remove_subscriber(scheduled_event, user)
+        event = client.get_event_by_scheduled_event(scheduled_event)
+        if event and event.has_participant(user):
+            event.remove_participant(user)
+            logger.info('Removed %s as a participant', user.name, extra={'event': scheduled_event.name, 'participant': user.name})
 
     @client.event
     async def on_message(message):
         if message.author.bot or message.guild or not message.attachments or not message.content:
             return
 
-        for guild in client.guilds:
-            for scheduled_event in guild.scheduled_events:
-                if scheduled_event.start_time < datetime.now().astimezone() + timedelta(hours=13):
-                    client.scheduled_events.append(scheduled_event)
+        client.refresh_upcoming_scheduled_events()
         await client.parse_scheduled_events()
-        event_name = message.content.lower()
-        for event in client.events:
-            if event_name == event.name.lower():
-                if event.created:
-                    try:
-                        image_bytes = await message.attachments[0].read()
-                        await event.scheduled_event.edit(image=image_bytes)
-                        await message.channel.send(f'Added your image to {event.name}.')
-                        print(f'{get_log_time()}> {event.name}> {message.author.name} added an image')
-                    except Exception as e:
-                        await message.channel.send(f'Failed to add your image to {event.name}.\nError: {e}')
-                        print(f'{get_log_time()}> {event.name}> Error adding image from {message.author.name}: {e}')
-                else:
-                    await message.channel.send(f'{event.name} has not been created yet. Please send an image after the event is created.')
-                return
-        await message.channel.send(f'Could not find event {event_name}.\n\n__Existing events:__\n{", ".join([event.name for event in client.events])}')
+        event_name = message.content
+        event = client.find_event(event_name)
+        if event:
+            if event.created:
+                try:
+                    image_bytes = await message.attachments[0].read()
+                    await event.scheduled_event.edit(image=image_bytes)
+                    await message.channel.send(f'Added your image to {event.name}.')
+                    logger.info('%s added an image', message.author.name, extra={'event': event.name})
+                except Exception as e:
+                    await message.channel.send(f'Failed to add your image to {event.name}.\nError: {e}')
+                    logger.error('Error adding image from %s: %s', message.author.name, e, extra={'event': event.name})
+            else:
+                await message.channel.send(f'{event.name} has not been created yet. Please send an image after the event is created.')
+            return
+        await message.channel.send(f'Could not find event {event_name}.\n\n__Existing events:__\n{", ".join(client.get_event_names())}')
 
     @client.tree.command(name='create', description='Create an event.')
     @app_commands.describe(event_name='Name for the event.')
@@ -694,27 +1773,25 @@ def main():
     @app_commands.describe(duration="Event duration in minutes (30 minutes default).")
     # @app_commands.describe(weekly="Whether you want this to be a weekly reoccuring event.")
     async def create_command(interaction: Interaction, event_name: str, voice_channel: VoiceChannel, start_time: str, image_url: str = None, role: str = None, duration: int = 30): #, weekly: bool = False
-        curHour, curMinute = get_time()
-        if curHour == 1 and curMinute >= 25 and curHour < 7:
+        if slot_calendar.is_closing():
             await interaction.response.send_message(f'It\'s late, you should go to bed. Try again later today.')
             return
 
         # Parse start time
         start_time = start_time.strip()
-        start_time.replace(':', '')
+        start_time = start_time.replace(':', '')
         if len(start_time) == 3:
             start_time = '0' + start_time
-        elif len(start_time) != 4:
+        if len(start_time) != 4 or not (start_time.isascii() and start_time.isdigit()) or int(start_time[:2]) >= 24 or int(start_time[2:]) >= 60:
             await interaction.response.send_message(f'Invalid start time format. Examples: "1630" or "00:30"')
+            return
         hour = int(start_time[:2])
         minute = int(start_time[2:])
-        start_time_obj = get_datetime_from_label(f"{hour}:{minute}")
-        if start_time_obj <= datetime.now().astimezone():
-            await interaction.response.send_message(f'Start time must be in the future!')
+        start_time_obj = slot_calendar.get_next_time(f"{hour}:{minute}")
 
         # Put participants into a list
         participants = []
-        print(f'{get_log_time()}> {event_name}> Received event request from {interaction.user.name}')
+        logger.info('Received event request from %s', interaction.user.name, extra={'event': event_name})
         if role != None:
             role = utils.find(lambda r: r.name.lower() == role.lower(), interaction.guild.roles)
         for member in interaction.channel.members:
@@ -727,8 +1804,23 @@ def main():
         # Make event
         event = Event(event_name, EntityType.voice, voice_channel, participants, interaction.guild, interaction.channel, image_url, duration, start_time_obj) #, weekly
         event.start_time = start_time_obj
-        client.events.append(event)
-        event.scheduled_event = await client.make_scheduled_event(event)
+        # keeps the solve stage off the event until create_event_job has made its scheduled event
+        event.ready_to_create = True
+        await interaction.response.defer(thinking=True)
+        client.add_event(event)
+        if not client.jobs.submit('create', create_event_job(interaction, event)):
+            await event.remove()
+            await interaction.followup.send(JOBS_BUSY_MESSAGE)
+
+    async def create_event_job(interaction: Interaction, event: Event):
+        try:
+            event.scheduled_event = await client.make_scheduled_event(event)
+        except Exception as e:
+            logger.error('Error creating scheduled event: %s', e, extra={'event': event.name})
+            if event.tracked:
+                await event.remove()
+            await interaction.followup.send(f'Failed to create {event.name}.\nError: {e}')
+            return
         response = ''
         if event.start_time.hour < 10 and event.start_time.minute < 10:
             response = f'{interaction.user.name} created an event called {event.name} starting at 0{event.start_time.hour}:0{event.start_time.minute} ET.'
@@ -739,9 +1831,9 @@ def main():
         else:
             response = f'{interaction.user.name} created an event called {event.name} starting at {event.start_time.hour}:{event.start_time.minute} ET.'
         try:
-            await interaction.response.send_message(response, view=EventButtons(event))
+            await interaction.followup.send(response, view=EventButtons(event))
         except Exception as e:
-            print(f'{get_log_time()}> Error sending interaction response to create event command: {e}')
+            logger.error('Error sending interaction response to create event command: %s', e)
 
     @client.tree.command(name='schedule', description='Create a scheduling event.')
     @app_commands.describe(event_name='Name for the event.')
@@ -749,16 +1841,17 @@ def main():
     @app_commands.describe(image_url="URL to an image for the event.")
     @app_commands.describe(role='Only add users with this role as participants.')
     @app_commands.describe(duration="Event duration in minutes (30 minutes default).")
+    @app_commands.describe(quorum="Pick the best attended time with at least this many participants instead of requiring everyone.")
+    @app_commands.describe(required_role="In quorum mode, participants with this role must be able to attend.")
     # @app_commands.describe(weekly="Whether you want this to be a weekly reoccuring event.")
-    async def schedule_command(interaction: Interaction, event_name: str, voice_channel: VoiceChannel, image_url: str = None, role: str = None, duration: int = 30): #, weekly: bool = False
-        curHour, curMinute = get_time()
-        if curHour == 1 and curMinute >= 25 and curHour < 7:
+    async def schedule_command(interaction: Interaction, event_name: str, voice_channel: VoiceChannel, image_url: str = None, role: str = None, duration: int = 30, quorum: int = 0, required_role: str = None): #, weekly: bool = False
+        if slot_calendar.is_closing():
             await interaction.response.send_message(f'It\'s late, you should go to bed. Try again later today.')
             return
 
         # Put participants into a list
         participants = []
-        print(f'{get_log_time()}> {event_name}> Received event request from {interaction.user.name}')
+        logger.info('Received event request from %s', interaction.user.name, extra={'event': event_name})
         if role != None:
             role = utils.find(lambda r: r.name.lower() == role.lower(), interaction.guild.roles)
         for member in interaction.channel.members:
@@ -771,219 +1864,177 @@ def main():
         # Make event object
         event = Event(event_name, EntityType.voice, voice_channel, participants, interaction.guild, interaction.channel, image_url, duration) #, weekly
         event.og_message_text = f'{interaction.user.name}' + event.og_message_text
+        if quorum > 0:
+            event.quorum = quorum
+            if required_role != None:
+                required_role = utils.find(lambda r: r.name.lower() == required_role.lower(), interaction.guild.roles)
+            if required_role != None:
+                event.required_ids = {participant.member.id for participant in event.participants if required_role in participant.member.roles}
         mentions = ''
         for participant in event.participants:
             mentions += f'{participant.member.mention} '
         mentions = '\nWaiting for a response from these participants:\n' + mentions
-        client.events.append(event)
+        client.add_event(event)
         try:
             await interaction.response.send_message(f'{event.og_message_text}')
         except Exception as e:
-            print(f'{get_log_time()}> Error sending schedule command response: {e}')
+            logger.error('Error sending schedule command response: %s', e)
         try:
             event.responded_message = await interaction.channel.send(f'{mentions}')
+            event.responded_content = mentions
             await event.dm_all_participants(interaction, duration)
         except Exception as e:
-            print(f'{get_log_time()}> Error DMing all participants or sending responded message: {e}')
+            logger.error('Error DMing all participants or sending responded message: %s', e)
 
     @client.tree.command(name='reschedule', description='Reschedule an existing scheduled event.')
     @app_commands.describe(event_name='Name of the event to reschedule.')
     @app_commands.describe(image_url='URL to an image for the event.')
     @app_commands.describe(duration='Event duration in minutes (default 30 minutes).')
     async def reschedule_command(interaction: Interaction, event_name: str, image_url: str = None, duration: int = 30):
-        for guild in client.guilds:
-            for scheduled_event in guild.scheduled_events:
-                if scheduled_event.start_time < datetime.now().astimezone() + timedelta(hours=13):
-                    client.scheduled_events.append(scheduled_event)
-        await client.parse_scheduled_events()
-        event_name = event_name.lower()
-        for event in client.events:
-            if event_name == event.name.lower():
-                print(f'{get_log_time()}> {event.name}> {interaction.user.name} requested reschedule')
-                if event.created:
-                    new_event = Event(event.name, event.entity_type, event.voice_channel, event.participants, event.guild, interaction.channel, image_url, duration) #, weekly
-                    client.scheduled_events.remove(event.scheduled_event)
-                    await event.scheduled_event.delete(reason='Reschedule command issued.')
-                    await event.remove()
-                    client.events.append(new_event)
-                    new_event.og_message_text = f'{interaction.user.name} wants to reschedule {new_event.name}. Check your DMs to share your availability!'
-                    mentions = ''
-                    for participant in event.participants:
-                        mentions += f'{participant.member.mention} '
-                    mentions = '\nWaiting for a response from these participants:\n' + mentions
-                    await interaction.response.send_message(f'{new_event.og_message_text}')
-                    new_event.responded_message = await interaction.channel.send(f'{mentions}')
-                    await new_event.dm_all_participants(interaction, duration, reschedule=True)
-                else:
-                    await interaction.response.send_message(f'{event.name} has not been created yet. Your buttons will work until it is created or cancelled.')
-                return
+        await interaction.response.defer(thinking=True)
+        if not client.jobs.submit('reschedule', reschedule_event_job(interaction, event_name, image_url, duration)):
+            await interaction.followup.send(JOBS_BUSY_MESSAGE)
+
+    async def reschedule_event_job(interaction: Interaction, event_name: str, image_url: str, duration: int):
         try:
-            await interaction.response.send_message(f'Could not find event {event_name}.\n\n__Existing events:__\n{", ".join([event.name for event in client.events])}', ephemeral=True)
+            await reschedule_event(interaction, event_name, image_url, duration)
         except Exception as e:
-            print(f'{get_log_time()}> Error responding to reschedule command: {e}')
+            logger.error('Error rescheduling event: %s', e, extra={'event': event_name})
+            try:
+                await interaction.followup.send(f'Failed to reschedule {event_name}.\nError: {e}')
+            except Exception as e:
+                logger.error('Error sending reschedule failure follow-up: %s', e, extra={'event': event_name})
 
-    @client.tree.command(name='cancel', description='Cancel an event.')
-    @app_commands.describe(event_name='Name of the event to cancel.')
-    async def cancel_command(interaction: Interaction, event_name: str):
-        for guild in client.guilds:
-            for scheduled_event in guild.scheduled_events:
-                if scheduled_event.start_time < datetime.now().astimezone() + timedelta(hours=13):
-                    client.scheduled_events.append(scheduled_event)
+    async def reschedule_event(interaction: Interaction, event_name: str, image_url: str, duration: int):
+        client.refresh_upcoming_scheduled_events()
         await client.parse_scheduled_events()
-        event_name = event_name.lower()
-        for event in client.events:
-            if event_name == event.name.lower():
-                print(f'{get_log_time()}> {event.name}> {interaction.user.name} cancelled event')
-                if event.created:
-                    client.scheduled_events.remove(event.scheduled_event)
-                    await event.scheduled_event.delete(reason='Cancel command issued.')
+        event = client.find_event(event_name, interaction.guild)
+        if event:
+            logger.info('%s requested reschedule', interaction.user.name, extra={'event': event.name})
+            if event.created:
+                new_event = Event(event.name, event.entity_type, event.voice_channel, event.participants, event.guild, interaction.channel, image_url, duration) #, weekly
+                new_event.quorum = event.quorum
+                new_event.required_ids = event.required_ids
+                client.discard_scheduled_event(event.scheduled_event)
+                await event.scheduled_event.delete(reason='Reschedule command issued.')
                 await event.remove()
+                client.add_event(new_event)
+                new_event.og_message_text = f'{interaction.user.name} wants to reschedule {new_event.name}. Check your DMs to share your availability!'
                 mentions = ''
                 for participant in event.participants:
-                    if participant.member != interaction.user:
-                        async with client.msg_lock:
-                            await participant.member.send(f'{interaction.user.name} has cancelled {event.name}.')
-                        mentions += participant.member.mention
-                await interaction.response.send_message(f'{mentions}\n{interaction.user.mention} has cancelled {event.name}.')
-                return
+                    mentions += f'{participant.member.mention} '
+                mentions = '\nWaiting for a response from these participants:\n' + mentions
+                await interaction.followup.send(f'{new_event.og_message_text}')
+                new_event.responded_message = await interaction.channel.send(f'{mentions}')
+                new_event.responded_content = mentions
+                await new_event.dm_all_participants(interaction, duration, reschedule=True)
+            else:
+                await interaction.followup.send(f'{event.name} has not been created yet. Your buttons will work until it is created or cancelled.')
+            return
+        await interaction.followup.send(f'Could not find event {event_name}.\n\n__Existing events:__\n{", ".join(client.get_event_names(interaction.guild))}')
+
+    @client.tree.command(name='cancel', description='Cancel an event.')
+    @app_commands.describe(event_name='Name of the event to cancel.')
+    async def cancel_command(interaction: Interaction, event_name: str):
+        # refreshing scheduled events and deleting one can take longer than the interaction deadline
+        await interaction.response.defer(thinking=True)
+        others = None
         try:
-            await interaction.response.send_message(f'Could not find event {event_name}.\n\n__Existing events:__\n{", ".join([event.name for event in client.events])}', ephemeral=True)
+            client.refresh_upcoming_scheduled_events()
+            await client.parse_scheduled_events()
+            event = client.find_event(event_name, interaction.guild)
+            if event is None:
+                await interaction.followup.send(f'Could not find event {event_name}.\n\n__Existing events:__\n{", ".join(client.get_event_names(interaction.guild))}')
+                return
+            logger.info('%s cancelled event', interaction.user.name, extra={'event': event.name})
+            if event.created:
+                client.discard_scheduled_event(event.scheduled_event)
+                await event.scheduled_event.delete(reason='Cancel command issued.')
+            await event.remove()
+            others = [participant.member for participant in event.participants if participant.member != interaction.user]
+            mentions = ''.join(member.mention for member in others)
+            await interaction.followup.send(f'{mentions}\n{interaction.user.mention} has cancelled {event.name}.')
         except Exception as e:
-            print(f'{get_log_time()}> Error responding to cancel command: {e}')
+            logger.error('Error cancelling event: %s', e, extra={'event': event_name})
+            try:
+                await interaction.followup.send(f'Failed to cancel {event_name}.\nError: {e}')
+            except Exception as e:
+                logger.error('Error sending cancel failure follow-up: %s', e, extra={'event': event_name})
+        # the event is gone once the participants are known, so tell them even if the follow-up failed
+        if others is not None:
+            await client.dm_dispatcher.broadcast(others, f'{interaction.user.name} has cancelled {event.name}.')
 
     @client.tree.command(name='bind', description='Bind a text channel to an existing event.')
     @app_commands.describe(event_name='Name of the vent to set this text channel for.')
     async def bind_command(interaction: Interaction, event_name: str):
-        for guild in client.guilds:
-            for scheduled_event in guild.scheduled_events:
-                if scheduled_event.start_time < datetime.now().astimezone() + timedelta(hours=13):
-                    client.scheduled_events.append(scheduled_event)
+        client.refresh_upcoming_scheduled_events()
         await client.parse_scheduled_events()
-        event_name = event_name.lower()
-        for event in client.events:
-            if event_name == event.name.lower():
-                try:
-                    event.text_channel = interaction.channel
-                    await interaction.response.send_message(f'Bound this text channel to {event.name}.', ephemeral=True)
-                    print(f'{get_log_time()}> {event.name}> Successfully bound text channel')
-                except Exception as e:
-                    await interaction.response.send_message(f'Failed to bind event to text channel: {e}', ephemeral=True)
-                    print(f'{get_log_time()}> {event.name}> Error binding text channel or responding to bind command: {e}')
-                return
+        event = client.find_event(event_name, interaction.guild)
+        if event:
+            try:
+                event.text_channel = interaction.channel
+                await interaction.response.send_message(f'Bound this text channel to {event.name}.', ephemeral=True)
+                logger.info('Successfully bound text channel', extra={'event': event.name})
+            except Exception as e:
+                await interaction.response.send_message(f'Failed to bind event to text channel: {e}', ephemeral=True)
+                logger.error('Error binding text channel or responding to bind command: %s', e, extra={'event': event.name})
+            return
         try:
-            await interaction.response.send_message(f'Could not find event {event_name}.\n\n__Existing events:__\n{", ".join([event.name for event in client.events])}', ephemeral=True)
+            await interaction.response.send_message(f'Could not find event {event_name}.\n\n__Existing events:__\n{", ".join(client.get_event_names(interaction.guild))}', ephemeral=True)
         except Exception as e:
-            print(f'{get_log_time()}> Error responding to bind command: {e}')
-
-    @tasks.loop(minutes=1)
-    async def create_guild_event():
-        local_scheduled_event_names = [scheduled_event.name for scheduled_event in client.scheduled_events]
+            logger.error('Error responding to bind command: %s', e)
+
+    @reschedule_command.autocomplete('event_name')
+    @cancel_command.autocomplete('event_name')
+    @bind_command.autocomplete('event_name')
+    async def event_name_autocomplete(interaction: Interaction, current: str):
+        return [app_commands.Choice(name=name, value=name) for name in client.get_event_names(interaction.guild, current)[:25]]
+
+    @tasks.loop(minutes=RECONCILE_INTERVAL)
+    @metrics.timed('scheduler_stage_seconds', stage='reconcile_scheduled_events')
+    async def reconcile_scheduled_events():
+        # Gateway events keep the registry current, this only reconciles against the guild cache in case one was missed
         for guild in client.guilds:
-            guild_scheduled_event_names = [scheduled_event.name for scheduled_event in guild.scheduled_events]
-            # Clean removed events
-            if guild.id in client.guild_scheduled_events:
-                try:
-                    for local_scheduled_event in client.guild_scheduled_events[guild.id].copy():
-                        if local_scheduled_event.name not in guild_scheduled_event_names:
-                            client.guild_scheduled_events[guild.id].remove(local_scheduled_event)
-                            client.scheduled_events.remove(local_scheduled_event)
-                            print(f'{get_log_time()}> {local_scheduled_event.name}> Guild scheduled_event is gone, removed from local scheduled_events')
-                except Exception as e: 
-                    print(f'{get_log_time()}> Error removing guild scheduled event: {e}')
-            # Add new events
-            for guild_scheduled_event in guild.scheduled_events:
-                if guild_scheduled_event.name not in local_scheduled_event_names:
-                    try:
-                        guild_events = client.guild_scheduled_events[guild.id]
-                        guild_events.append(guild_scheduled_event)
-                    except:
-                        guild_events = [guild_scheduled_event]
-                    client.guild_scheduled_events[guild.id] = guild_events
-                    client.scheduled_events.append(guild_scheduled_event)
-                    print(f'{get_log_time()}> {guild_scheduled_event.name}> New guild scheduled_event, added to local scheduled_events')
-                else:
-                    for event in client.events:
-                        if event.name == guild_scheduled_event.name:
-                            async for interested in guild_scheduled_event.users():
-                                participant_names = [participant.member.name for participant in event.participants]
-                                if interested.name not in participant_names:
-                                    event.participants.append(Participant(interested))
-                                    print(f'{get_log_time()}> {guild_scheduled_event.name}> Added {interested.name} as a participant')
-                            break
-                    participant_names = []
-        await client.parse_scheduled_events()
-
-        curTime = datetime.now().astimezone().replace(second=0, microsecond=0)
-        for event in client.events.copy():
             try:
-                if not event.valid:
-                    await event.text_channel.send(f'No shared availability has been found. Scheduling for {event.name} has been cancelled.\n' + event.reason)
-                    for participant in event.participants:
-                        await participant.member.send(f'Scheduling for {event.name} has been cancelled.')
-                    await event.remove()
-                    print(f'{get_log_time()}> {event.name}> Event invalid, removed event from memory')
-                elif not event.created and get_datetime_from_label('01:30') <= curTime:
-                    await event.remove()
-                    print(f'{get_log_time()}> {event.name}> last time slot passed, removed event from memory')
+                guild_scheduled_event_ids = {scheduled_event.id for scheduled_event in guild.scheduled_events}
+                local_scheduled_events = client.scheduled_events.setdefault(guild.id, {})
+                for local_scheduled_event in list(local_scheduled_events.values()):
+                    if local_scheduled_event.id not in guild_scheduled_event_ids:
+                        client.discard_scheduled_event(local_scheduled_event)
+                        logger.info('Guild scheduled_event is gone, removed from local scheduled_events', extra={'event': local_scheduled_event.name})
+                for guild_scheduled_event in guild.scheduled_events:
+                    if guild_scheduled_event.id not in local_scheduled_events:
+                        client.upsert_scheduled_event(guild_scheduled_event)
+                        logger.info('Missed guild scheduled_event, added to local scheduled_events', extra={'event': guild_scheduled_event.name})
             except Exception as e:
-                print(f'{get_log_time()}> Error invalidating and deleting event: {e}')
-
-        for event in client.events:
-            try:
-                await event.nudge_unresponded_participants()
-
-                if event.created:
-                    if curTime + timedelta(minutes=5) == event.start_time and event.scheduled_event.status == EventStatus.scheduled and not event.started:
-                        if event.text_channel:
-                            try:
-                                await event.text_channel.send(f'**5 minute warning!** {event.name} is scheduled to start in 5 minutes.')
-                            except Exception as e:
-                                print(f'{get_log_time()}> Error sending 5 minute nudge: {e}')
-                        elif not event.text_channel:
-                            for participant in event.participants:
-                                await participant.member.send(f'**5 minute warning!** {event.name} is scheduled to start in 5 minutes.')
-                    continue
+                logger.error('Error reconciling guild scheduled events: %s', e, extra={'guild': guild.name})
+        try:
+            await client.parse_scheduled_events()
+        except Exception as e:
+            logger.error('Error parsing scheduled events: %s', e)
 
-                if event.changed or not event.has_everyone_answered():
-                    event.changed = False
-                    continue
+    @tasks.loop(minutes=1)
+    @metrics.timed('scheduler_stage_seconds', stage='solve_events')
+    async def solve_events():
+        await client.solve_events()
 
-                event.check_times()
-            except Exception as e:
-                print(f'{get_log_time()}> Error nudging or sending 5 minute warning: {e}')
+    @tasks.loop(minutes=1)
+    @metrics.timed('scheduler_stage_seconds', stage='save_state')
+    async def save_state():
+        try:
+            await client.save_state()
+        except Exception as e:
+            logger.error('Error saving state to %s: %s', client.state_filename, e)
 
-            if event.ready_to_create:
-                try:
-                    event.scheduled_event = await client.make_scheduled_event(event)
-                except Exception as e:
-                    print(f'{get_log_time()}> Error creating scheduled event: {e}')
-                try:
-                    mentions = ''
-                    unsubbed = ''
-                    for participant in event.participants:
-                        if participant.subscribed:
-                            mentions += f'{participant.member.mention} '
-                        else:
-                            unsubbed += f'{participant.member.name} '
-                    if unsubbed != '':
-                        unsubbed = '\nUnsubscribed: ' + unsubbed
-                except Exception as e:
-                    print(f'{get_log_time()}> Error generating mentions/unsubbed strings: {e}')
-                try:
-                    response = ''
-                    if event.start_time.hour < 10 and event.start_time.minute < 10:
-                        response = f'{mentions}\nHeads up! You are all available for {event.name} starting today at 0{event.start_time.hour}:0{event.start_time.minute} ET.\n' + unsubbed
-                    elif event.start_time.hour >= 10 and event.start_time.minute < 10:
-                        response = f'{mentions}\nHeads up! You are all available for {event.name} starting today at {event.start_time.hour}:0{event.start_time.minute} ET.\n' + unsubbed
-                    elif event.start_time.hour < 10 and event.start_time.minute >= 10:
-                        response = f'{mentions}\nHeads up! You are all available for {event.name} starting today at 0{event.start_time.hour}:{event.start_time.minute} ET.\n' + unsubbed
-                    else:
-                        response = f'{mentions}\nHeads up! You are all available for {event.name} starting today at {event.start_time.hour}:{event.start_time.minute} ET.\n' + unsubbed
-                    await event.text_channel.send(content=response, view=EventButtons(event))
-                except Exception as e:
-                    print(f'{get_log_time()}> Error sending event created notification with buttons: {e}')
+    @tasks.loop(minutes=METRICS_DUMP_INTERVAL)
+    async def dump_metrics():
+        logger.info('Metrics:\n%s', metrics.render())
 
-    client.run(discord_token)
+    listener = setup_logging()
+    try:
+        client.run(discord_token)
+    finally:
+        listener.stop()
 
 
 if __name__ == '__main__':
@@ -1,5 +1,8 @@
 '''Written by Cael Shoop.'''
 
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time, timedelta
+
 thirteen_hundred_hours            = '13:00'
 thirteen_hundred_thirty_hours     = '13:30'
 fourteen_hundred_hours            = '14:00'
@@ -30,3 +33,109 @@ done                              = 'Done'
 
 all_timestamps = ['13:00','13:30','14:00','14:30','15:00','15:30','16:00','16:30','17:00','17:30','18:00','18:30','19:00','19:30',
                      '20:00','20:30','21:00','21:30','22:00','22:30','23:00','23:30','00:00','00:30','01:00','01:30']
+
+
+def parse_label(label: str):
+    hour, _, minute = label.partition(':')
+    return timedelta(hours=int(hour), minutes=int(minute))
+
+
+class SlotCalendar:
+    # Aware datetimes for every slot in the scheduling window, built once per scheduling day
+    def __init__(self, start: str = thirteen_hundred_hours, end: str = one_hundred_thirty_hours, minutes: int = 30, days: int = 1):
+        start_offset = parse_label(start)
+        end_offset = parse_label(end)
+        # a window like 13:00-01:30 runs past midnight, so its day only rolls over once the last slot has passed
+        self.wraps = end_offset < start_offset
+        if self.wraps:
+            end_offset += timedelta(days=1)
+            self.rollover = end_offset - timedelta(days=1)
+        else:
+            self.rollover = timedelta()
+        # offset of each slot from midnight of the day the window starts
+        self.offsets = []
+        self.labels = []
+        for day in range(days):
+            offset = start_offset
+            while offset <= end_offset:
+                clock = offset % timedelta(days=1)
+                label = f'{clock.seconds // 3600:02}:{clock.seconds % 3600 // 60:02}'
+                if days > 1:
+                    label = f'Day {day + 1} {label}'
+                self.offsets.append(timedelta(days=day) + offset)
+                self.labels.append(label)
+                offset += timedelta(minutes=minutes)
+        self.index = {label: index for index, label in enumerate(self.labels)}
+        self.mask = (1 << len(self.labels)) - 1
+        self.days = days
+        self.day = None
+        self.times = []
+        # scheduling day -> slot times, polls keep resolving against the grid of the day they started on
+        self.grids = {}
+
+    def refresh(self, now: datetime = None):
+        if now is None:
+            now = datetime.now().astimezone()
+        day = (now.replace(tzinfo=None) - self.rollover).date()
+        if day != self.day:
+            self.times = self.get_times(day)
+            self.day = day
+            # a multi-day window that started this long ago has fully passed
+            for old_day in [old_day for old_day in self.grids if old_day <= day - timedelta(days=self.days)]:
+                del self.grids[old_day]
+        return self.times
+
+    def get_times(self, day: date):
+        # slot times of the window starting on day
+        times = self.grids.get(day)
+        if times is None:
+            midnight = datetime.combine(day, time())
+            times = self.grids[day] = [(midnight + offset).astimezone() for offset in self.offsets]
+        return times
+
+    def get_day(self, now: datetime = None):
+        # the scheduling day whose window is current at now
+        self.refresh(now)
+        return self.day
+
+    @staticmethod
+    def get_next_time(label: str, now: datetime = None):
+        # next occurrence of an HH:MM time after now, independent of the grid, e.g. /create start times
+        if now is None:
+            now = datetime.now().astimezone()
+        offset = parse_label(label)
+        moment = (datetime.combine(now.date(), time()) + offset).astimezone()
+        if moment <= now:
+            moment = (datetime.combine(now.date() + timedelta(days=1), time()) + offset).astimezone()
+        return moment
+
+    def is_closing(self, now: datetime = None, minutes: int = 5):
+        # True when the last slot of the current window starts within minutes, too late to start a poll
+        if now is None:
+            now = datetime.now().astimezone()
+        return not self.get_labels_after(now, minutes)
+
+    def get_last_time(self, day: date = None):
+        return (self.get_times(day) if day else self.refresh())[-1]
+
+    def get_future_mask(self, now: datetime = None, day: date = None):
+        # mask of the slots starting at or after now, in the window of day or the current one
+        if now is None:
+            now = datetime.now().astimezone()
+        first = bisect_left(self.get_times(day) if day else self.refresh(now), now)
+        return self.mask >> first << first
+
+    def get_overlap_mask(self, start: datetime, end: datetime, minutes: int, day: date = None):
+        # mask of the slots where an event lasting minutes would overlap [start, end)
+        times = self.get_times(day) if day else self.refresh()
+        first = bisect_right(times, start - timedelta(minutes=minutes))
+        last = bisect_left(times, end)
+        if first >= last:
+            return 0
+        return (1 << last) - (1 << first)
+
+    def get_labels_after(self, now: datetime = None, minutes: int = 0):
+        # labels of the current window's slots starting more than minutes after now
+        if now is None:
+            now = datetime.now().astimezone()
+        return self.labels[bisect_right(self.refresh(now), now + timedelta(minutes=minutes)):]